@@ -0,0 +1,86 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class AsyncDatabase:
+    """
+    Fachada async de Database para el loop de Flet.
+
+    Cada llamada corre en un ThreadPoolExecutor acotado (MAX_WORKERS hilos).
+    Como Database tiene una conexión larga por hilo, el pool de conexiones
+    queda acotado igual. Con todos los hilos ocupados las llamadas esperan
+    en la cola del executor sin bloquear el loop: las sesiones no bloquean
+    la UI de las demás ni crean hilos propios.
+
+    Cancelar el await no corta una consulta que ya empezó (termina en su
+    hilo y el resultado se descarta); para cortarla está Database.interrupt.
+    """
+
+    MAX_WORKERS = 4
+
+    def __init__(self, db, max_workers: int | None = None):
+        self.db = db
+        self.max_workers = self.MAX_WORKERS if max_workers is None else max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="db"
+        )
+        # Llamadas en curso o en cola (si supera max_workers, el executor satura)
+        self.pending = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Corre fn(*args, **kwargs) en el executor (cualquier cosa que toque la BD)."""
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            return await loop.run_in_executor(
+                self.executor, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self.pending -= 1
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    # ---- métodos de Database que usa main (el buscador va por SearchPipeline) ----
+
+    async def init_schema_and_seed(self):
+        return await self.run(self.db.init_schema_and_seed)
+
+    async def get_cash_register_by_qr(self, qr_token: str):
+        return await self.run(self.db.get_cash_register_by_qr, qr_token)
+
+    async def get_product_by_barcode(self, barcode: str):
+        return await self.run(self.db.get_product_by_barcode, barcode)
+
+    async def create_cart(self, cashier_id: int) -> int:
+        return await self.run(self.db.create_cart, cashier_id)
+
+    async def add_item_to_cart(
+        self, cart_id: int, product_id: int, quantity: int, unit_price: float
+    ):
+        return await self.run(
+            self.db.add_item_to_cart, cart_id, product_id, quantity, unit_price
+        )
+
+    async def remove_cart_item(self, cart_item_id: int):
+        return await self.run(self.db.remove_cart_item, cart_item_id)
+
+    async def get_cart_items(self, cart_id: int):
+        return await self.run(self.db.get_cart_items, cart_id)
+
+    async def checkout_context(self, caja_numero: int | None):
+        return await self.run(self.db.checkout_context, caja_numero)
+
+    async def create_sale_from_cart(self, cart_id: int, caja_numero: int | None = None):
+        return await self.run(self.db.create_sale_from_cart, cart_id, caja_numero=caja_numero)
+
+
+def configured_workers() -> int:
+    """Hilos del executor de la BD según DB_WORKERS (por defecto MAX_WORKERS)."""
+    try:
+        return max(1, int(os.environ.get("DB_WORKERS", AsyncDatabase.MAX_WORKERS)))
+    except ValueError:
+        return AsyncDatabase.MAX_WORKERS
@@ -0,0 +1,72 @@
+"""
+Normalización de códigos de barras (EAN-8, UPC-A, EAN-13).
+
+productos.codigo_barr es BIGINT: comparar contra el texto del TextField o de
+pyzbar obliga a SQLite a convertir tipos y, con CAST(... AS TEXT), impide usar
+idx_productos_codigo. Acá convertimos todo a int antes de consultar.
+"""
+
+VALID_LENGTHS = (8, 12, 13)
+
+
+class InvalidBarcode(ValueError):
+    """El texto leído no es un código EAN/UPC válido."""
+
+
+def gtin_check_digit(body: str) -> int:
+    """Dígito verificador GTIN (sirve para EAN-8, UPC-A y EAN-13)."""
+    total = 0
+    # Pesos 3,1,3,1... desde la derecha
+    for i, ch in enumerate(reversed(body)):
+        total += int(ch) * (3 if i % 2 == 0 else 1)
+    return (10 - total % 10) % 10
+
+
+def has_valid_check_digit(code: int | str) -> bool:
+    digits = str(code)
+    if len(digits) < 2:
+        return False
+    return gtin_check_digit(digits[:-1]) == int(digits[-1])
+
+
+def normalize_barcode(raw: str | int, validate_check_digit: bool = True) -> int:
+    """
+    Devuelve el código como int listo para comparar con codigo_barr.
+
+    - quita espacios
+    - exige solo dígitos y largo 8, 12 o 13
+    - UPC-A (12) se rellena a EAN-13 con un 0 adelante (mismo int)
+    - opcionalmente valida el dígito verificador
+    """
+    digits = str(raw).strip()
+    if not digits.isdigit():
+        raise InvalidBarcode(f"El código '{raw}' tiene caracteres no numéricos.")
+    if len(digits) not in VALID_LENGTHS:
+        raise InvalidBarcode(
+            f"El código '{raw}' tiene {len(digits)} dígitos (se esperan 8, 12 o 13)."
+        )
+    if len(digits) == 12:
+        digits = "0" + digits
+    if validate_check_digit and not has_valid_check_digit(digits):
+        raise InvalidBarcode(f"Dígito verificador inválido en '{raw}'.")
+    return int(digits)
+
+
+def barcode_prefix_ranges(prefix: str) -> list[tuple[int, int]]:
+    """
+    Rangos [desde, hasta] de codigo_barr que empiezan con esos dígitos,
+    para cada largo válido. Permite buscar por prefijo con BETWEEN (índice)
+    en vez de CAST(codigo_barr AS TEXT) LIKE (scan completo).
+    """
+    prefix = prefix.strip()
+    if not prefix.isdigit():
+        return []
+    value = int(prefix)
+    ranges = []
+    for length in VALID_LENGTHS:
+        missing = length - len(prefix)
+        if missing < 0:
+            continue
+        scale = 10 ** missing
+        ranges.append((value * scale, (value + 1) * scale - 1))
+    return ranges
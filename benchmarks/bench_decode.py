@@ -0,0 +1,72 @@
+"""
+Benchmark: ms/frame de la decodificación sobre frames grabados.
+
+Cada imagen del directorio (PNG/JPG; SVG solo con cairosvg) se pega centrada
+en un frame de cámara simulado de 640x480 y se decodifica de dos formas:
+- original: pyzbar sobre el frame BGR completo, todas las simbologías
+- etapa nueva: decoder.FrameDecoder (gris + ROI central + simbologías del modo)
+
+Uso:
+    python benchmarks/bench_decode.py --frames qr_cajas --mode qr
+    python benchmarks/bench_decode.py --frames barcodes_png --mode barcode
+"""
+import argparse
+import time
+from pathlib import Path
+
+from pyzbar.pyzbar import decode
+
+from common import ROOT_DIR
+
+from decoder import product_decoder, qr_decoder
+from frame_sources import compose_frame, load_image
+
+
+def load_frames(directory: Path) -> list:
+    frames = []
+    for path in sorted(directory.iterdir()):
+        image = load_image(path)
+        if image is None:
+            continue
+        frames.append(compose_frame(image))
+    return frames
+
+
+def bench(label: str, decode_fn, frames: list, repeat: int):
+    hits = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            if decode_fn(frame):
+                hits += 1
+    elapsed = time.perf_counter() - start
+    total = len(frames) * repeat
+    print(
+        f"  {label:<28} {elapsed * 1000 / total:7.2f} ms/frame  "
+        f"lecturas {hits}/{total}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=Path, default=ROOT_DIR / "qr_cajas")
+    parser.add_argument("--mode", choices=("qr", "barcode"), default="qr")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames)
+    if not frames:
+        raise SystemExit(f"No hay imágenes legibles en {args.frames}")
+    print(f"{len(frames)} frames de {args.frames} (modo {args.mode})")
+
+    decoder = qr_decoder() if args.mode == "qr" else product_decoder()
+    bench("original (BGR, todo)", decode, frames, args.repeat)
+    bench("FrameDecoder", decoder.decode, frames, args.repeat)
+    print(
+        f"  aciertos en ROI: {decoder.roi_hits}, "
+        f"en frame completo: {decoder.full_hits}"
+    )
+
+
+if __name__ == "__main__":
+    main()
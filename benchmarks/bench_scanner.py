@@ -0,0 +1,183 @@
+"""
+Benchmark del escáner sobre frames grabados (sin cámara ni Flet).
+
+Reproduce qr_cajas/ (tokens esperados sacados de la tabla cajas por id) y
+barcodes_png/ (los SVG de barcodes_svg/ ya renderizados) como un stream de
+cámara: cada código queda frente a la cámara --hold segundos y después se
+retira. La cámara se simula a --fps con una cola de un lugar (igual que
+camera.FrameQueue): mientras el decodificador está ocupado los frames se
+descartan y se procesa siempre el más reciente.
+
+Para cada pipeline informa:
+- ms/frame de decodificación (media y p95) y throughput (frames/s)
+- tiempo hasta la primera lectura confirmada de cada código (media/máx)
+- códigos no leídos y tasa de lecturas falsas (confirmadas con un valor
+  distinto al del código en cuadro)
+
+Pipelines comparados:
+- original: pyzbar sobre el frame BGR completo, todas las simbologías,
+  se acepta la primera lectura
+- nuevo: decoder.FrameDecoder + decoder.ScanConfirmer
+
+Uso:
+    python benchmarks/bench_scanner.py
+    python benchmarks/bench_scanner.py --mode qr --fps 15 --hold 1.5
+    python benchmarks/bench_scanner.py --mode barcode --frames /ruta/a/video.mp4
+"""
+import argparse
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from pyzbar.pyzbar import decode
+
+from common import DB_PATH, ROOT_DIR, percentile
+
+from decoder import ScanConfirmer, product_decoder, qr_decoder
+from frame_sources import ImageDirSource, VideoFileSource
+
+DEFAULT_FRAMES = {"qr": ROOT_DIR / "qr_cajas", "barcode": ROOT_DIR / "barcodes_png"}
+QR_FILE_RE = re.compile(r"_id(\d+)\.", re.IGNORECASE)
+
+
+def qr_labels(directory: Path) -> dict[str, str]:
+    """archivo -> token esperado, según el id de caja del nombre (caja_N_idM.png)."""
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    try:
+        tokens = dict(conn.execute("SELECT id, qr_token FROM cajas"))
+    finally:
+        conn.close()
+    labels = {}
+    for path in directory.iterdir():
+        match = QR_FILE_RE.search(path.name)
+        if match and int(match.group(1)) in tokens:
+            labels[path.name] = tokens[int(match.group(1))]
+    return labels
+
+
+def record(source) -> list[tuple[object, str | None]]:
+    """Lee toda la fuente a memoria: [(frame, valor esperado)]."""
+    frames = []
+    while True:
+        ok, frame = source.read()
+        if not ok:
+            break
+        frames.append((frame, getattr(source, "label", None)))
+    source.release()
+    return frames
+
+
+def original_pipeline():
+    def step(frame, _now):
+        return [r.data.decode("utf-8") for r in decode(frame)]
+    return step
+
+
+def new_pipeline(mode: str):
+    decoder = qr_decoder() if mode == "qr" else product_decoder()
+    confirmer = ScanConfirmer()
+
+    def step(frame, now):
+        return confirmer.feed(decoder.decode(frame), now=now)
+    return step
+
+
+def simulate(step, frames: list, fps: float) -> dict:
+    """
+    Corre el pipeline contra una cámara simulada a `fps`. El reloj es
+    virtual (frame i llega en i/fps) pero el costo de cada decode es el real.
+    """
+    interval = 1.0 / fps
+    appeared: dict[str, float] = {}
+    first_read: dict[str, float] = {}
+    decode_ms: list[float] = []
+    reads = false_reads = 0
+    busy_until = 0.0
+
+    idx = 0
+    while idx < len(frames):
+        # Cola de un lugar: si el decodificador se atrasó, saltar al último frame llegado
+        latest = min(len(frames) - 1, int(busy_until / interval))
+        idx = max(idx, latest)
+        frame, label = frames[idx]
+        arrival = idx * interval
+        now = max(arrival, busy_until)
+        if label is not None:
+            appeared.setdefault(label, arrival)
+
+        start = time.perf_counter()
+        codes = step(frame, now)
+        elapsed = time.perf_counter() - start
+        decode_ms.append(elapsed * 1000)
+        busy_until = now + elapsed
+
+        for code in codes:
+            reads += 1
+            if code != label:
+                false_reads += 1
+            elif code not in first_read:
+                first_read[code] = busy_until
+        idx += 1
+
+    latencies = [(first_read[c] - appeared[c]) * 1000 for c in first_read if c in appeared]
+    total_s = sum(decode_ms) / 1000
+    return {
+        "processed": len(decode_ms),
+        "ms_mean": sum(decode_ms) / len(decode_ms) if decode_ms else 0.0,
+        "ms_p95": percentile(decode_ms, 95),
+        "throughput": len(decode_ms) / total_s if total_s else 0.0,
+        "ttfd_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "ttfd_max": max(latencies, default=0.0),
+        "missed": len(set(appeared) - set(first_read)),
+        "codes": len(appeared),
+        "reads": reads,
+        "false_rate": false_reads / reads if reads else 0.0,
+    }
+
+
+def report(name: str, r: dict):
+    print(
+        f"  {name:<10} {r['ms_mean']:7.2f} ms/frame (p95 {r['ms_p95']:6.2f})  "
+        f"{r['throughput']:7.1f} frames/s  "
+        f"1ª lectura {r['ttfd_mean']:6.0f} ms (máx {r['ttfd_max']:5.0f})  "
+        f"no leídos {r['missed']}/{r['codes']}  "
+        f"falsas {r['false_rate'] * 100:4.1f}% de {r['reads']}"
+    )
+
+
+def open_recording(mode: str, path: Path, fps: float, hold: float):
+    if path.is_dir():
+        labels = qr_labels(path) if mode == "qr" else None
+        return ImageDirSource(
+            path,
+            frames_per_image=max(1, round(hold * fps)),
+            gap_frames=max(1, round(0.5 * fps)),
+            labels=labels,
+        )
+    # Un video no trae valores esperados: solo sirve para ms/frame y throughput
+    return VideoFileSource(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=("qr", "barcode", "all"), default="all")
+    parser.add_argument("--frames", type=Path, help="directorio de imágenes o video")
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--hold", type=float, default=1.0, help="segundos por código")
+    args = parser.parse_args()
+
+    modes = ("qr", "barcode") if args.mode == "all" else (args.mode,)
+    for mode in modes:
+        path = args.frames or DEFAULT_FRAMES[mode]
+        frames = record(open_recording(mode, path, args.fps, args.hold))
+        if not frames:
+            print(f"[{mode}] sin frames legibles en {path}")
+            continue
+        print(f"[{mode}] {len(frames)} frames de {path} a {args.fps:g} fps")
+        report("original", simulate(original_pipeline(), frames, args.fps))
+        report("nuevo", simulate(new_pipeline(mode), frames, args.fps))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: escaneos por segundo con muchos carritos concurrentes.
+
+Compara el acceso original (una conexión nueva por llamada, journal DELETE)
+contra el pool de conexiones por hilo con WAL de main.Database.
+
+Uso:
+    python benchmarks/bench_scans.py --carts 16 --scans 200
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+from common import cleanup, copy_database
+
+from main import Database
+
+
+class DatabaseConexionPorLlamada(Database):
+    """Comportamiento previo al pool: sqlite3.connect en cada método."""
+
+    def _get_conn(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_S)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+
+def run(db: Database, carts: int, scans: int) -> float:
+    db.init_schema_and_seed()
+    caja = db.get_cash_register_by_qr("CAJA1-SUPER-TOKEN-ABC123XYZ789")
+    codes = [str(row["barcode"]) for row in db.list_products()]
+    cart_ids = [db.create_cart(caja["id"]) for _ in range(carts)]
+    errors: list[Exception] = []
+
+    def shopper(cart_id: int):
+        try:
+            for i in range(scans):
+                prod = db.get_product_by_barcode(codes[i % len(codes)])
+                db.add_item_to_cart(cart_id, prod["id"], 1, float(prod["price"]))
+                db.get_cart_items(cart_id)
+        except Exception as ex:  # noqa: BLE001 - se reporta al final
+            errors.append(ex)
+
+    threads = [threading.Thread(target=shopper, args=(cid,)) for cid in cart_ids]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        print(f"  errores: {len(errors)} (primero: {errors[0]!r})")
+    return carts * scans / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--carts", type=int, default=16)
+    parser.add_argument("--scans", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.carts} carritos x {args.scans} escaneos")
+    for label, cls, journal in (
+        ("conexión por llamada", DatabaseConexionPorLlamada, "DELETE"),
+        ("pool por hilo + WAL", Database, None),
+    ):
+        path = copy_database(journal_mode=journal)
+        db = cls(str(path))
+        try:
+            rate = run(db, args.carts, args.scans)
+        finally:
+            db.close()
+            cleanup(path)
+        print(f"  {label:<22} {rate:10.1f} escaneos/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: latencia de Database.list_products con un catálogo grande.
+
+Agrega productos sintéticos a una copia de la BD (por defecto 100k) y mide
+búsquedas por texto (FTS5 con prefijos), por código y el listado sin filtro,
+simulando lo que dispara cada tecla en el diálogo de productos.
+
+Uso:
+    python benchmarks/bench_search.py --products 100000
+"""
+import argparse
+import random
+import time
+
+from common import cleanup, copy_database, percentile
+
+from main import Database
+
+WORDS = [
+    "aceite", "arroz", "azucar", "leche", "yerba", "galletitas", "fideos",
+    "harina", "jabon", "detergente", "gaseosa", "agua", "cafe", "te", "queso",
+    "jamon", "pan", "manteca", "sal", "pimienta", "girasol", "soja", "entera",
+    "descremada", "integral", "light", "clasico", "familiar", "chico", "grande",
+]
+QUERIES = ["a", "ac", "ace", "aceite g", "leche ent", "yerba", "gas", "7790", "queso cl"]
+
+
+def populate(db: Database, products: int):
+    rnd = random.Random(42)
+    conn = db._get_conn()
+    with conn:
+        cat = conn.execute("SELECT id FROM categorias ORDER BY id LIMIT 1").fetchone()["id"]
+        rows = []
+        for i in range(products):
+            desc = " ".join(rnd.sample(WORDS, 3)).upper() + f" {rnd.randint(100, 2000)}ML"
+            rows.append((7790000000000 + i, desc, cat, 10.0, 12.5))
+        conn.executemany(
+            """
+            INSERT INTO productos (codigo_barr, descripcion, categoria_id, precio_compra, precio_venta)
+            VALUES (?,?,?,?,?)
+            """,
+            rows,
+        )
+    conn.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = copy_database()
+    db = Database(str(path))
+    try:
+        db.init_schema_and_seed()
+        start = time.perf_counter()
+        populate(db, args.products)
+        print(f"{args.products} productos cargados en {time.perf_counter() - start:.1f}s")
+
+        for query in QUERIES + [""]:
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                rows = db.list_products(query)
+                times.append((time.perf_counter() - t0) * 1000)
+            print(
+                f"  {query!r:<12} {len(rows):3d} filas  "
+                f"p50={percentile(times, 50):7.2f} ms  p95={percentile(times, 95):7.2f} ms"
+            )
+    finally:
+        db.close()
+        cleanup(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: posteo de stock de un ticket de muchas líneas.
+
+Compara, sobre una copia de la BD:
+- por fila: venta/compra ya cerrada y una inserción de detalle por línea
+  (los triggers actualizan productos, movimientos y totales en cada fila)
+- en bloque: documento en inventory.STAGING_STATE, detalle con executemany,
+  inventory.post_stock() y totales una sola vez
+
+Uso:
+    python benchmarks/bench_stock_posting.py --lines 100 --repeat 50
+"""
+import argparse
+import time
+
+from bench_search import populate
+from common import cleanup, copy_database, percentile
+
+import inventory
+from main import Database
+
+
+def sale_header(conn, estado: str) -> int:
+    caja = conn.execute("SELECT id FROM cajas ORDER BY id LIMIT 1").fetchone()["id"]
+    usuario = conn.execute("SELECT id FROM usuarios ORDER BY id LIMIT 1").fetchone()["id"]
+    apertura = conn.execute(
+        "INSERT INTO aperturas_caja (caja_id, usuario_id, monto_inicial, estado) "
+        "VALUES (?,?,0,'abierta')",
+        (caja, usuario),
+    ).lastrowid
+    return conn.execute(
+        "INSERT INTO ventas (caja_id, usuario_id, apertura_id, estado) VALUES (?,?,?,?)",
+        (caja, usuario, apertura, estado),
+    ).lastrowid
+
+
+def purchase_header(conn, estado: str) -> int:
+    usuario = conn.execute("SELECT id FROM usuarios ORDER BY id LIMIT 1").fetchone()["id"]
+    proveedor = conn.execute("SELECT id FROM proveedores ORDER BY id LIMIT 1").fetchone()["id"]
+    return conn.execute(
+        "INSERT INTO compras (proveedor_id, usuario_id, estado) VALUES (?,?,?)",
+        (proveedor, usuario, estado),
+    ).lastrowid
+
+
+def post(conn, doc: inventory.StockDocument, lines: list, batched: bool) -> float:
+    header = sale_header if doc is inventory.VENTA else purchase_header
+    insert = (
+        f"INSERT INTO {doc.detail} ({doc.fk}, producto_id, cantidad, precio_unitario, subtotal) "
+        "VALUES (?,?,?,?,?)"
+    )
+    start = time.perf_counter()
+    with conn:
+        if batched:
+            doc_id = header(conn, inventory.STAGING_STATE)
+            conn.executemany(insert, [(doc_id, *line) for line in lines])
+            inventory.post_stock(conn, doc, doc_id)
+            total = sum(line[3] for line in lines)
+            conn.execute(
+                f"UPDATE {doc.header} SET subtotal = ?, total = ?, estado = 'completada' "
+                "WHERE id = ?",
+                (total, total, doc_id),
+            )
+        else:
+            doc_id = header(conn, "completada")
+            for line in lines:
+                conn.execute(insert, (doc_id, *line))
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    path = copy_database()
+    db = Database(str(path))
+    try:
+        db.init_schema_and_seed()
+        populate(db, args.lines)
+        conn = db._get_conn()
+        products = conn.execute(
+            "SELECT id, precio_venta FROM productos ORDER BY id DESC LIMIT ?", (args.lines,)
+        ).fetchall()
+        lines = [(p["id"], 1, p["precio_venta"], p["precio_venta"]) for p in products]
+        # Stock holgado: las alertas de stock mínimo no entran en la medición
+        with conn:
+            conn.executemany(
+                "UPDATE productos SET stock = 1000000 WHERE id = ?", [(p["id"],) for p in products]
+            )
+
+        print(f"ticket de {len(lines)} líneas, {args.repeat} repeticiones")
+        for doc in (inventory.VENTA, inventory.COMPRA):
+            for label, batched in (("por fila", False), ("en bloque", True)):
+                times = [post(conn, doc, lines, batched) for _ in range(args.repeat)]
+                print(
+                    f"  {doc.header:<8} {label:<10} "
+                    f"p50={percentile(times, 50):7.2f} ms  p95={percentile(times, 95):7.2f} ms"
+                )
+    finally:
+        db.close()
+        cleanup(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Verifica con EXPLAIN QUERY PLAN que las consultas del camino caliente de
+main.Database usen índices (ningún "SCAN" de tabla completa).
+
+Se ejecutan los métodos reales sobre una copia de la BD, se capturan las
+sentencias con set_trace_callback y se explica cada una. Sale con código 1
+si alguna hace un scan.
+
+Uso:
+    python benchmarks/check_query_plans.py
+"""
+import sys
+from typing import Callable, NamedTuple
+
+from common import cleanup, copy_database
+
+import inventory
+import sales_summary
+from main import Database
+
+QR_TOKEN = "CAJA1-SUPER-TOKEN-ABC123XYZ789"
+
+
+class Check(NamedTuple):
+    name: str
+    call: Callable[[], object]
+    # Si se indica, alguna sentencia de la operación debe mencionarlo en su plan
+    expect: str | None = None
+    # Paginado con LIMIT: se acepta recorrer un índice en orden (SCAN ... USING INDEX)
+    bounded: bool = False
+
+
+def is_full_scan(detail: str, bounded: bool, materialized: set[str] = frozenset()) -> bool:
+    if not detail.startswith("SCAN "):
+        return False
+    # Subconsulta ya materializada (acotada) en la misma sentencia: "SCAN <alias>"
+    if detail[5:] in materialized:
+        return False
+    # Filas constantes o subconsultas ya acotadas dentro de la misma sentencia
+    if detail == "SCAN CONSTANT ROW" or detail.startswith("SCAN (subquery-"):
+        return False
+    # MATCH sobre FTS5: el plan lo muestra como SCAN pero es una búsqueda en el índice
+    if "VIRTUAL TABLE INDEX" in detail and ":M" in detail:
+        return False
+    if bounded and " USING INDEX " in detail:
+        return False
+    return True
+
+
+def post_last_sale(db: Database):
+    conn = db._get_conn()
+    venta_id = conn.execute("SELECT MAX(venta_id) FROM detalle_ventas").fetchone()[0]
+    with conn:
+        inventory.post_sale(conn, venta_id or 0)
+
+
+def query(db: Database, sql: str):
+    return db._get_conn().execute(sql).fetchall()
+
+
+def run_rollup(db: Database):
+    with db._transaction() as conn:
+        sales_summary.rollup(conn, sales_summary.rollup_since())
+
+
+def resolve_context(db: Database, caja_numero: int):
+    db.invalidate_checkout_context(caja_numero)
+    return db.checkout_context(caja_numero)
+
+
+def hot_path_calls(db: Database) -> list[Check]:
+    """Operaciones del camino caliente a verificar."""
+    caja = db.get_cash_register_by_qr(QR_TOKEN)
+    product = db.list_products(limit=1)[0]
+    cart_id = db.create_cart(caja["id"])
+    line = db.add_item_to_cart(cart_id, product["id"], 1, float(product["price"]))
+    checkout_cart = db.create_cart(caja["id"])
+    db.add_item_to_cart(checkout_cart, product["id"], 2, float(product["price"]))
+    return [
+        Check("get_cash_register_by_qr", lambda: db.get_cash_register_by_qr(QR_TOKEN), "qr_token=?"),
+        Check("create_cart", lambda: db.create_cart(caja["id"])),
+        Check(
+            "add_item_to_cart",
+            lambda: db.add_item_to_cart(cart_id, product["id"], 1, float(product["price"])),
+        ),
+        Check("get_cart_items", lambda: db.get_cart_items(cart_id), "idx_cart_items_cart_product"),
+        Check("remove_cart_item", lambda: db.remove_cart_item(line["id"])),
+        Check("close_cart", lambda: db.close_cart(cart_id)),
+        Check("checkout_context", lambda: resolve_context(db, caja["numero"]), "idx_aperturas_caja"),
+        Check(
+            "create_sale_from_cart",
+            lambda: db.create_sale_from_cart(checkout_cart, caja_numero=caja["numero"]),
+            "idx_cart_items_cart_product",
+        ),
+        Check("list_products por código", lambda: db.list_products("7793"), "idx_productos_codigo"),
+        Check("list_products por texto", lambda: db.list_products("aceite gir"), "VIRTUAL TABLE"),
+        Check(
+            "list_products sin filtro",
+            lambda: db.list_products(""),
+            "idx_productos_descripcion",
+            bounded=True,
+        ),
+        # Un miss en el índice en memoria cae a la consulta por codigo_barr
+        Check(
+            "get_product_by_barcode (miss)",
+            lambda: db.get_product_by_barcode("4006381333931"),
+            "codigo_barr=?",
+        ),
+        # Posteo de stock del checkout: solo las líneas de la venta
+        Check("inventory.post_sale", lambda: post_last_sale(db), "idx_detalle_ventas_venta"),
+        # Tableros: rango de fechas sobre ventas o lectura de los resúmenes diarios
+        Check("vw_ventas_hoy", lambda: query(db, "SELECT * FROM vw_ventas_hoy"), "idx_ventas_fecha"),
+        Check(
+            "vw_top_productos_vendidos",
+            lambda: query(db, "SELECT * FROM vw_top_productos_vendidos"),
+            "ventas_producto_diarias USING PRIMARY KEY",
+        ),
+        Check(
+            "vw_resumen_ventas_hoy",
+            lambda: query(db, "SELECT * FROM vw_resumen_ventas_hoy"),
+            "r USING PRIMARY KEY (fecha=?)",
+        ),
+        Check("sales_summary.rollup", lambda: run_rollup(db), "idx_ventas_fecha"),
+    ]
+
+
+def explain(conn, sql: str) -> list[str]:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def main() -> int:
+    path = copy_database()
+    db = Database(str(path))
+    failures = 0
+    try:
+        db.init_schema_and_seed()
+        conn = db._get_conn()
+        for name, call, expected, bounded in hot_path_calls(db):
+            statements: list[str] = []
+            conn.set_trace_callback(statements.append)
+            try:
+                call()
+            finally:
+                conn.set_trace_callback(None)
+
+            plan: list[str] = []
+            for sql in statements:
+                head = sql.lstrip().split(None, 1)[0].upper()
+                if head not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+                    continue
+                details = explain(conn, sql)
+                plan.extend(details)
+                materialized = {d[12:] for d in details if d.startswith("MATERIALIZE ")}
+                scans = [d for d in details if is_full_scan(d, bounded, materialized)]
+                status = "FALLA" if scans else "ok"
+                failures += bool(scans)
+                print(f"[{status}] {name}")
+                for d in details:
+                    print(f"        {d}")
+
+            if expected and not any(expected in d for d in plan):
+                failures += 1
+                print(f"[FALLA] {name}: no usa el índice esperado ({expected})")
+    finally:
+        db.close()
+        cleanup(path)
+
+    print(f"\n{failures} problema(s) de plan de consulta")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
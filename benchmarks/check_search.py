@@ -0,0 +1,100 @@
+"""
+Verifica los resultados de Database.list_products contra una búsqueda directa.
+
+Para cada consulta se calcula lo esperado recorriendo la tabla productos:
+- búsqueda numérica: primero los códigos que empiezan con esos dígitos
+  (barcode_prefix_ranges, ordenados por código) y después las descripciones
+  con una palabra que empieza con el número ("900" -> "ACEITE ... 900ML")
+- búsqueda de texto: descripciones con todas las palabras por prefijo
+y se compara con lo que devuelve list_products, completo y paginado. Sale
+con código 1 si algo no coincide.
+
+Uso:
+    python benchmarks/check_search.py --products 2000
+"""
+import argparse
+import re
+import sys
+
+from bench_search import populate
+from common import cleanup, copy_database
+
+from barcodes import barcode_prefix_ranges
+from main import Database
+
+QUERIES = ["900", "500", "250", "7", "7793", "1000", "aceite", "leche ent", "ac"]
+
+
+def words(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def expected(db: Database, search: str) -> tuple[list[int], set[int]]:
+    """(ids por código, en orden; ids por descripción, sin orden fijo)."""
+    rows = db._get_conn().execute(
+        "SELECT id, codigo_barr, descripcion FROM productos WHERE COALESCE(activo, 1) = 1"
+    ).fetchall()
+    ranges = barcode_prefix_ranges(search)
+    tokens = words(search)
+    by_code: list[tuple[int, int]] = []
+    by_text: set[int] = set()
+    for row in rows:
+        code = row["codigo_barr"]
+        if any(lo <= code <= hi for lo, hi in ranges):
+            by_code.append((code, row["id"]))
+        elif tokens and all(
+            any(w.startswith(t) for w in words(row["descripcion"] or "")) for t in tokens
+        ):
+            by_text.add(row["id"])
+    return [pid for _, pid in sorted(by_code)], by_text
+
+
+def check(db: Database, search: str, page: int) -> list[str]:
+    by_code, by_text = expected(db, search)
+    got = [row["id"] for row in db.list_products(search, limit=None)]
+    problems = []
+    if got[: len(by_code)] != by_code:
+        problems.append("los códigos no vienen primero y en orden")
+    if set(got[len(by_code):]) != by_text or len(got) != len(by_code) + len(by_text):
+        problems.append(f"descripciones: esperadas {len(by_text)}, devueltas {len(got) - len(by_code)}")
+    paged = []
+    while True:
+        rows = db.list_products(search, limit=page, offset=len(paged))
+        paged.extend(row["id"] for row in rows)
+        if len(rows) < page:
+            break
+    if paged != got:
+        problems.append("el paginado no coincide con el listado completo")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=2000, help="productos sintéticos a agregar")
+    parser.add_argument("--page", type=int, default=7, help="tamaño de página a comparar")
+    args = parser.parse_args()
+
+    path = copy_database()
+    db = Database(str(path))
+    failures = 0
+    try:
+        db.init_schema_and_seed()
+        if args.products:
+            populate(db, args.products)
+            db.product_index.invalidate()
+        for search in QUERIES:
+            problems = check(db, search, args.page)
+            failures += bool(problems)
+            print(f"[{'FALLA' if problems else 'ok'}] {search!r}")
+            for problem in problems:
+                print(f"        {problem}")
+    finally:
+        db.close()
+        cleanup(path)
+
+    print(f"\n{failures} búsqueda(s) con diferencias")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
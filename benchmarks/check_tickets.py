@@ -0,0 +1,95 @@
+"""
+Prueba de concurrencia de los números de ticket.
+
+Simula varios kioscos (una instancia de Database por kiosco, cada una con su
+TicketAllocator, como si fueran procesos distintos) con varios hilos que
+cierran carritos al mismo tiempo contra una copia de la BD. Verifica que:
+- ningún checkout falle (antes: IntegrityError por numero_ticket repetido
+  cuando dos ventas caían en el mismo segundo)
+- todos los tickets sean únicos
+- dentro de cada kiosco los números de una caja sean crecientes
+
+Uso:
+    python benchmarks/check_tickets.py --kiosks 4 --threads 4 --sales 50
+"""
+import argparse
+import sys
+import threading
+import time
+
+from common import cleanup, copy_database
+
+from main import Database
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kiosks", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--sales", type=int, default=50, help="checkouts por hilo")
+    args = parser.parse_args()
+
+    path = copy_database()
+    kiosks = [Database(str(path)) for _ in range(args.kiosks)]
+    try:
+        kiosks[0].init_schema_and_seed()
+        caja = kiosks[0].get_cash_register_by_qr("CAJA1-SUPER-TOKEN-ABC123XYZ789")
+        product = kiosks[0].list_products(limit=1)[0]
+
+        # (kiosco, ticket) en orden de emisión por hilo
+        issued: list[tuple[int, list[str]]] = []
+        errors: list[Exception] = []
+        barrier = threading.Barrier(args.kiosks * args.threads)
+
+        def cashier(kiosk_idx: int):
+            db = kiosks[kiosk_idx]
+            tickets = []
+            try:
+                barrier.wait()
+                for _ in range(args.sales):
+                    cart_id = db.create_cart(caja["id"])
+                    db.add_item_to_cart(cart_id, product["id"], 1, float(product["price"]))
+                    venta_id = db.create_sale_from_cart(cart_id, caja_numero=caja["numero"])
+                    row = db._get_conn().execute(
+                        "SELECT numero_ticket FROM ventas WHERE id = ?", (venta_id,)
+                    ).fetchone()
+                    tickets.append(row["numero_ticket"])
+            except Exception as ex:  # noqa: BLE001 - se reporta al final
+                errors.append(ex)
+            issued.append((kiosk_idx, tickets))
+
+        threads = [
+            threading.Thread(target=cashier, args=(k,))
+            for k in range(args.kiosks)
+            for _ in range(args.threads)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        all_tickets = [t for _, tickets in issued for t in tickets]
+        duplicates = len(all_tickets) - len(set(all_tickets))
+        unordered = sum(tickets != sorted(tickets) for _, tickets in issued)
+        reservations = sum(db.tickets.reservations for db in kiosks)
+
+        print(
+            f"{len(all_tickets)} ventas en {elapsed:.2f}s "
+            f"({len(all_tickets) / elapsed:.0f} ventas/s), "
+            f"{reservations} reservas de bloque"
+        )
+        print(f"  errores: {len(errors)}" + (f" (primero: {errors[0]!r})" if errors else ""))
+        print(f"  tickets repetidos: {duplicates}")
+        print(f"  hilos con tickets fuera de orden: {unordered}")
+        print(f"  ejemplo: {min(all_tickets, default='-')} .. {max(all_tickets, default='-')}")
+        return 1 if errors or duplicates or unordered else 0
+    finally:
+        for db in kiosks:
+            db.close()
+        cleanup(path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+Los benchmarks nunca tocan database/supermarket.db: trabajan sobre una copia
+temporal para que los números sean repetibles y la BD real quede intacta.
+"""
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = ROOT_DIR / "database" / "supermarket.db"
+
+# Permite "python benchmarks/xxx.py" desde la raíz del repo
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+
+def copy_database(journal_mode: str | None = None) -> Path:
+    """Copia la BD a un directorio temporal y devuelve la ruta de la copia."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="shopping-cart-bench-"))
+    target = tmp_dir / "supermarket.db"
+    # backup() respeta el WAL pendiente, a diferencia de copiar el archivo
+    src = sqlite3.connect(DB_PATH)
+    dst = sqlite3.connect(target)
+    with dst:
+        src.backup(dst)
+    if journal_mode:
+        dst.execute(f"PRAGMA journal_mode={journal_mode}")
+    src.close()
+    dst.close()
+    return target
+
+
+def cleanup(db_path: Path):
+    shutil.rmtree(db_path.parent, ignore_errors=True)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
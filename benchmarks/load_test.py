@@ -0,0 +1,331 @@
+"""
+Prueba de carga: N compradores simultáneos contra main.Database.
+
+Cada comprador es un hilo que repite, hasta que termina la prueba:
+    get_cash_register_by_qr -> create_cart
+    -> canasta de productos: get_product_by_barcode + add_item_to_cart
+       (con pausas de "pensar" entre escaneos)
+    -> create_sale_from_cart
+El tamaño de la canasta y las pausas son aleatorios (exponenciales alrededor
+de --basket y --think-ms), con algunos productos escaneados dos veces y
+algunas lecturas que no están en el catálogo. Todo corre sobre una copia de
+la BD; --cajas agrega cajas móviles para repartir a los compradores.
+
+Reporta p50/p95/p99 por operación, throughput y errores (aparte los
+"database is locked"). Con --json se guardan los resultados y con --baseline
+se comparan contra una corrida anterior, para medir cambios en la capa de
+datos. --kiosks reparte los compradores en varias instancias de Database
+(como procesos distintos).
+
+Uso:
+    python benchmarks/load_test.py --shoppers 200 --duration 60
+    python benchmarks/load_test.py --shoppers 200 --json base.json
+    python benchmarks/load_test.py --shoppers 200 --baseline base.json
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from bench_search import populate
+from common import cleanup, copy_database, percentile
+
+from main import Database
+
+OPERATIONS = (
+    "get_cash_register_by_qr",
+    "create_cart",
+    "get_product_by_barcode",
+    "add_item_to_cart",
+    "create_sale_from_cart",
+)
+# Código que no existe en el catálogo (EAN-13 con dígito verificador válido)
+UNKNOWN_BARCODE = "2000000000008"
+
+
+class Results:
+    """Latencias y errores por operación, juntados de todos los hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.times: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.locked: dict[str, int] = defaultdict(int)
+        self.first_error: str | None = None
+        self.sales = 0
+        self.scans = 0
+
+    def merge(self, times: dict[str, list[float]], errors, locked, sales: int, scans: int):
+        with self._lock:
+            for op, values in times.items():
+                self.times[op].extend(values)
+            for op, count in errors.items():
+                self.errors[op] += count
+            for op, count in locked.items():
+                self.locked[op] += count
+            self.sales += sales
+            self.scans += scans
+
+    def error(self, message: str):
+        with self._lock:
+            if self.first_error is None:
+                self.first_error = message
+
+    def summary(self, elapsed: float) -> dict:
+        ops = {}
+        for op in OPERATIONS:
+            values = self.times.get(op, [])
+            ops[op] = {
+                "count": len(values),
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+                "errors": self.errors.get(op, 0),
+                "locked": self.locked.get(op, 0),
+            }
+        total_ops = sum(len(v) for v in self.times.values())
+        return {
+            "elapsed_s": elapsed,
+            "ops_per_s": total_ops / elapsed if elapsed else 0.0,
+            "sales_per_s": self.sales / elapsed if elapsed else 0.0,
+            "scans_per_s": self.scans / elapsed if elapsed else 0.0,
+            "operations": ops,
+        }
+
+
+def add_cajas(db: Database, count: int) -> list[str]:
+    """Asegura `count` cajas móviles activas (numero 1..count) y devuelve sus tokens."""
+    conn = db._get_conn()
+    with conn:
+        template = conn.execute("SELECT * FROM cash_registers ORDER BY id LIMIT 1").fetchone()
+        for numero in range(1, count + 1):
+            conn.execute(
+                """
+                INSERT INTO cash_registers (numero, nombre, ubicacion, qr_token, cashier_user_id)
+                SELECT ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM cash_registers WHERE numero = ?)
+                """,
+                (
+                    numero,
+                    f"Caja Móvil {numero}",
+                    template["ubicacion"],
+                    f"LOADTEST-CAJA{numero}",
+                    template["cashier_user_id"],
+                    numero,
+                ),
+            )
+    rows = conn.execute(
+        "SELECT qr_token FROM cash_registers WHERE estado = 'activa' AND numero <= ? ORDER BY numero",
+        (count,),
+    ).fetchall()
+    return [row["qr_token"] for row in rows]
+
+
+def shopper(
+    idx: int,
+    db: Database,
+    tokens: list[str],
+    barcodes: list[str],
+    args,
+    deadline: float,
+    results: Results,
+):
+    rnd = random.Random(args.seed + idx)
+    times: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    locked: dict[str, int] = defaultdict(int)
+    sales = scans = 0
+
+    def think(mean_ms: float):
+        if mean_ms > 0:
+            time.sleep(min(rnd.expovariate(1000.0 / mean_ms), mean_ms * 5 / 1000.0))
+
+    def timed(op: str, fn, *fn_args, **fn_kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*fn_args, **fn_kwargs)
+        except sqlite3.OperationalError as ex:
+            if "locked" in str(ex):
+                locked[op] += 1
+            errors[op] += 1
+            results.error(f"{op}: {ex!r}")
+            return None
+        except Exception as ex:  # noqa: BLE001 - se cuenta y se sigue
+            errors[op] += 1
+            results.error(f"{op}: {ex!r}")
+            return None
+        finally:
+            times[op].append((time.perf_counter() - t0) * 1000)
+
+    # Los compradores no llegan todos en el mismo instante
+    time.sleep(rnd.uniform(0, args.ramp))
+    while time.monotonic() < deadline:
+        caja = timed("get_cash_register_by_qr", db.get_cash_register_by_qr, rnd.choice(tokens))
+        if caja is None:
+            think(args.think_ms)
+            continue
+        cart_id = timed("create_cart", db.create_cart, caja["id"])
+        if cart_id is None:
+            continue
+
+        basket = max(1, round(rnd.expovariate(1.0 / args.basket)))
+        scanned: list[str] = []
+        for _ in range(basket):
+            if time.monotonic() >= deadline:
+                break
+            think(args.think_ms)
+            roll = rnd.random()
+            if scanned and roll < 0.1:
+                code = rnd.choice(scanned)        # mismo producto otra vez
+            elif roll < 0.13:
+                code = UNKNOWN_BARCODE            # lectura fuera del catálogo
+            else:
+                code = rnd.choice(barcodes)
+            product = timed("get_product_by_barcode", db.get_product_by_barcode, code)
+            scans += 1
+            if product is None:
+                continue
+            scanned.append(code)
+            timed(
+                "add_item_to_cart",
+                db.add_item_to_cart,
+                cart_id,
+                product["id"],
+                1,
+                float(product["price"]),
+            )
+
+        think(args.think_ms * 3)  # camino a "Finalizar compra"
+        venta_id = timed(
+            "create_sale_from_cart", db.create_sale_from_cart, cart_id, caja_numero=caja["numero"]
+        )
+        if venta_id is not None:
+            sales += 1
+
+    results.merge(times, errors, locked, sales, scans)
+
+
+def print_summary(summary: dict, args):
+    print(
+        f"{args.shoppers} compradores, {args.kiosks} instancia(s) de Database, "
+        f"{summary['elapsed_s']:.1f}s"
+    )
+    print(
+        f"  throughput: {summary['ops_per_s']:.0f} ops/s, "
+        f"{summary['scans_per_s']:.1f} escaneos/s, {summary['sales_per_s']:.2f} ventas/s"
+    )
+    print(f"  {'operación':<25} {'n':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'errores':>8} {'locked':>7}")
+    for op, stats in summary["operations"].items():
+        print(
+            f"  {op:<25} {stats['count']:7d} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} "
+            f"{stats['p99_ms']:8.2f} {stats['errors']:8d} {stats['locked']:7d}"
+        )
+
+
+def print_comparison(summary: dict, baseline: dict):
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+6.1f}%" if old else "     -"
+
+    print("  contra baseline (p95 / throughput):")
+    print(
+        f"    ops/s {baseline['ops_per_s']:.0f} -> {summary['ops_per_s']:.0f} "
+        f"({delta(summary['ops_per_s'], baseline['ops_per_s'])})"
+    )
+    for op, stats in summary["operations"].items():
+        old = baseline["operations"].get(op)
+        if old is None:
+            continue
+        print(
+            f"    {op:<25} p95 {old['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f} ms "
+            f"({delta(stats['p95_ms'], old['p95_ms'])})  "
+            f"locked {old['locked']} -> {stats['locked']}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--shoppers", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos de prueba")
+    parser.add_argument("--ramp", type=float, default=2.0, help="segundos para que lleguen todos")
+    parser.add_argument("--think-ms", type=float, default=800.0, help="pausa media entre escaneos")
+    parser.add_argument("--basket", type=float, default=12.0, help="productos por compra (media)")
+    parser.add_argument("--cajas", type=int, default=4, help="cajas móviles a repartir")
+    parser.add_argument("--kiosks", type=int, default=1, help="instancias de Database")
+    parser.add_argument("--products", type=int, default=0, help="productos sintéticos a agregar")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    parser.add_argument("--baseline", help="comparar contra un --json anterior")
+    args = parser.parse_args()
+
+    path = copy_database()
+    kiosks = [Database(str(path)) for _ in range(args.kiosks)]
+    try:
+        db = kiosks[0]
+        db.init_schema_and_seed()
+        if args.products:
+            populate(db, args.products)
+        tokens = add_cajas(db, args.cajas)
+        conn = db._get_conn()
+        barcodes = [
+            str(row["codigo_barr"])
+            for row in conn.execute(
+                "SELECT codigo_barr FROM productos WHERE COALESCE(activo, 1) = 1"
+            )
+        ]
+        # Stock holgado: las alertas de stock mínimo no entran en la medición
+        with conn:
+            conn.execute("UPDATE productos SET stock = 1000000")
+        for kiosk in kiosks:
+            kiosk.product_index.invalidate()
+
+        results = Results()
+        deadline = time.monotonic() + args.ramp + args.duration
+        threads = [
+            threading.Thread(
+                target=shopper,
+                args=(
+                    i,
+                    kiosks[i % args.kiosks],
+                    tokens,
+                    barcodes,
+                    args,
+                    deadline,
+                    results,
+                ),
+                name=f"shopper-{i}",
+                daemon=True,
+            )
+            for i in range(args.shoppers)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        summary = results.summary(elapsed)
+        print_summary(summary, args)
+        if results.first_error:
+            print(f"  primer error: {results.first_error}")
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                print_comparison(summary, json.load(f))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), **summary}, f, indent=2)
+        return 1 if any(s["errors"] for s in summary["operations"].values()) else 0
+    finally:
+        for kiosk in kiosks:
+            kiosk.close()
+        cleanup(path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Genera barcodes_png/ a partir de barcodes_svg/ sin cairosvg ni Pillow.
+
+Los SVG de python-barcode son solo rectángulos negros sobre blanco, así que
+alcanza con rasterizarlos a mano (cada módulo de 0.33 mm queda en MODULE_PX
+píxeles enteros, sin bordes difusos) y escribir un PNG en gris con zlib.
+bench_scanner y bench_decode leen estos PNG, que van commiteados: así el
+modo barcode corre en una máquina sin cairo.
+
+Uso:
+    python benchmarks/render_barcodes.py
+"""
+import re
+import struct
+import zlib
+
+from common import ROOT_DIR
+
+SVG_DIR = ROOT_DIR / "barcodes_svg"
+PNG_DIR = ROOT_DIR / "barcodes_png"
+
+# Ancho de un módulo EAN en el SVG (mm) y en el PNG (px)
+MODULE_MM = 0.33
+MODULE_PX = 4
+
+SIZE_RE = re.compile(r'<svg[^>]*width="([\d.]+)mm" height="([\d.]+)mm"')
+RECT_RE = re.compile(
+    r'<rect x="([\d.]+)mm" y="([\d.]+)mm" width="([\d.]+)mm" height="([\d.]+)mm" '
+    r'style="fill:black;"'
+)
+
+
+def rasterize(svg: str) -> list[bytearray]:
+    """Filas de píxeles (0 = negro, 255 = blanco) de las barras del SVG."""
+    scale = MODULE_PX / MODULE_MM
+    width_mm, height_mm = map(float, SIZE_RE.search(svg).groups())
+    width, height = round(width_mm * scale), round(height_mm * scale)
+    rows = [bytearray(b"\xff" * width) for _ in range(height)]
+    for x, y, w, h in RECT_RE.findall(svg):
+        left, top = round(float(x) * scale), round(float(y) * scale)
+        right = left + round(float(w) * scale)
+        bottom = top + round(float(h) * scale)
+        for row in rows[top:bottom]:
+            row[left:right] = b"\x00" * (right - left)
+    return rows
+
+
+def write_png(path, rows: list[bytearray]):
+    """PNG de 8 bits en escala de grises, sin filtro por fila."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    width, height = len(rows[0]), len(rows)
+    raw = b"".join(b"\x00" + bytes(row) for row in rows)
+    path.write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, 9))
+        + chunk(b"IEND", b"")
+    )
+
+
+def main():
+    PNG_DIR.mkdir(exist_ok=True)
+    for svg_path in sorted(SVG_DIR.glob("*.svg")):
+        png_path = PNG_DIR / f"{svg_path.stem}.png"
+        write_png(png_path, rasterize(svg_path.read_text(encoding="utf-8")))
+        print(f"{svg_path.name} -> {png_path.relative_to(ROOT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Awaitable, Callable
+
+from frame_sources import open_frame_source
+from metrics import FAST_BUCKETS_MS, METRICS
+
+
+class FrameQueue:
+    """
+    Cola acotada de frames: si el consumidor se atrasa se descartan los más
+    viejos, así siempre se procesa el frame más reciente.
+    """
+
+    def __init__(self, maxsize: int = 1):
+        self._frames = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+            self._cond.notify()
+
+    def get(self, timeout: float | None = None):
+        """Devuelve el próximo frame o None si no llegó ninguno a tiempo."""
+        with self._cond:
+            if not self._frames:
+                self._cond.wait(timeout)
+            if not self._frames:
+                return None
+            return self._frames.popleft()
+
+    def clear(self):
+        with self._cond:
+            self._frames.clear()
+
+
+class AsyncFrameQueue:
+    """
+    FrameQueue para consumidores asyncio: el hilo de captura hace put() y el
+    frame se entrega en el loop con call_soon_threadsafe, sin hilos extra
+    esperando frames.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 1):
+        self._loop = loop
+        self._frames = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, frame):
+        # Llamado desde el hilo de captura
+        try:
+            self._loop.call_soon_threadsafe(self._put, frame)
+        except RuntimeError:
+            # Loop cerrado (fin de la sesión)
+            pass
+
+    def _put(self, frame):
+        if len(self._frames) == self._frames.maxlen:
+            self.dropped += 1
+        self._frames.append(frame)
+        self._ready.set()
+
+    async def get(self, timeout: float | None = None):
+        """Devuelve el próximo frame o None si no llegó ninguno a tiempo."""
+        if not self._frames:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if not self._frames:
+            return None
+        frame = self._frames.popleft()
+        if not self._frames:
+            self._ready.clear()
+        return frame
+
+    def clear(self):
+        self._frames.clear()
+        self._ready.clear()
+
+
+class CameraService:
+    """
+    Cámara compartida por toda la sesión.
+
+    Se abre una sola vez (la primera vez que alguien la pide) y queda abierta:
+    los escaneos siguientes no pagan el arranque del dispositivo. Un hilo de
+    captura reparte cada frame a las colas de los suscriptores; sin
+    suscriptores solo hace grab() para que el buffer del driver no envejezca.
+
+    `source` es el índice de la cámara o una ruta (directorio de imágenes o
+    archivo de video, ver frame_sources) para escanear frames grabados.
+    """
+
+    READ_ERRORS_BEFORE_FAIL = 10
+    # Pausa tras una lectura fallida: no girar en vacío con la cámara caída
+    READ_RETRY_S = 0.05
+
+    def __init__(self, source: int | str = 0, **source_options):
+        self.source = source
+        self._source_options = source_options
+        self._cap = None
+        self._thread: threading.Thread | None = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._subscribers: list[FrameQueue] = []
+        self.error: str | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._running
+
+    def open(self) -> bool:
+        """Abre la cámara si no estaba abierta. Devuelve False si no se pudo."""
+        with self._lock:
+            if self._running:
+                return True
+            cap = open_frame_source(self.source, **self._source_options)
+            if not cap.isOpened():
+                cap.release()
+                self.error = "No se pudo abrir la cámara."
+                return False
+            self._cap = cap
+            self.error = None
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._capture_loop, name="camera-capture", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def close(self):
+        """Libera la cámara (fin de la sesión)."""
+        with self._lock:
+            self._running = False
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
+
+    def subscribe(self, maxsize: int = 1) -> FrameQueue:
+        queue = FrameQueue(maxsize)
+        with self._lock:
+            self._subscribers.append(queue)
+        return queue
+
+    def subscribe_async(self, maxsize: int = 1) -> AsyncFrameQueue:
+        """Cola que entrega los frames en el loop de asyncio que llama."""
+        queue = AsyncFrameQueue(asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: FrameQueue | AsyncFrameQueue):
+        with self._lock:
+            if queue in self._subscribers:
+                self._subscribers.remove(queue)
+
+    def _capture_loop(self):
+        cap = self._cap
+        errors = 0
+        try:
+            while self._running:
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                # Sin suscriptores solo se descarta el frame (grab no decodifica)
+                if subscribers:
+                    ret, frame = cap.read()
+                else:
+                    ret, frame = cap.grab(), None
+                if not ret:
+                    # Cámara desconectada o fuente de imágenes agotada
+                    errors += 1
+                    if errors >= self.READ_ERRORS_BEFORE_FAIL:
+                        self.error = "No se pudo leer la cámara."
+                        break
+                    time.sleep(self.READ_RETRY_S)
+                    continue
+                errors = 0
+                for queue in subscribers:
+                    queue.put(frame)
+        finally:
+            cap.release()
+            with self._lock:
+                self._running = False
+                if self._cap is cap:
+                    self._cap = None
+
+
+class ScanWorker:
+    """
+    Única tarea decodificadora de la sesión (asyncio).
+
+    QR y código de barras son modos: start() se suscribe a la cámara y por
+    cada frame corre decode(frame) en el executor (fuera del loop) y después
+    await on_codes(códigos) en el loop, hasta que devuelva True (lectura
+    confirmada) o se llame a stop(), que cancela la tarea. Cambiar de modo
+    reemplaza al anterior. Se usa solo desde el loop de la sesión.
+
+    `executor` acota los hilos que decodifican; None usa el executor por
+    defecto del loop (compartido por todas las sesiones del proceso).
+    """
+
+    FRAME_TIMEOUT_S = 1.0
+
+    def __init__(self, camera: CameraService, executor: Executor | None = None):
+        self.camera = camera
+        self._executor = executor
+        self._mode: str | None = None
+        self._generation = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def mode(self) -> str | None:
+        return self._mode
+
+    async def start(
+        self,
+        mode: str,
+        decode: Callable[[object], list[str]],
+        on_codes: Callable[[list[str]], Awaitable[bool]],
+        on_stop: Callable[[str | None], None] | None = None,
+    ) -> bool:
+        """
+        Empieza a escanear en ese modo. on_stop(error) se llama al terminar
+        (error es None si terminó por lectura confirmada o stop()).
+        """
+        loop = asyncio.get_running_loop()
+        # Abrir el dispositivo puede tardar: no se hace en el loop
+        if not await loop.run_in_executor(self._executor, self.camera.open):
+            if on_stop is not None:
+                on_stop(self.camera.error)
+            return False
+        self.stop()
+        self._generation += 1
+        self._mode = mode
+        self._task = asyncio.create_task(
+            self._run(mode, self._generation, decode, on_codes, on_stop), name=f"scan-{mode}"
+        )
+        return True
+
+    def stop(self):
+        self._generation += 1
+        self._mode = None
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+
+    def _active(self, generation: int) -> bool:
+        return generation == self._generation
+
+    async def _run(self, mode, generation, decode, on_codes, on_stop):
+        loop = asyncio.get_running_loop()
+        queue = self.camera.subscribe_async()
+        error = None
+        decode_ms = METRICS.histogram("scan_decode_ms", FAST_BUCKETS_MS, mode=mode)
+
+        def timed_decode(frame):
+            start = time.perf_counter()
+            try:
+                return decode(frame)
+            finally:
+                decode_ms.observe((time.perf_counter() - start) * 1000)
+
+        try:
+            while self._active(generation):
+                frame = await queue.get(timeout=self.FRAME_TIMEOUT_S)
+                if frame is None:
+                    if not self.camera.is_open:
+                        error = self.camera.error
+                        break
+                    continue
+                codes = await loop.run_in_executor(self._executor, timed_decode, frame)
+                if not self._active(generation):
+                    break
+                if await on_codes(codes):
+                    break
+        finally:
+            # También al cancelar: on_stop es síncrono, no espera nada
+            self.camera.unsubscribe(queue)
+            if self._active(generation):
+                self._mode = None
+                self._task = None
+            if on_stop is not None:
+                on_stop(error)
@@ -0,0 +1,96 @@
+from typing import Callable
+
+import flet as ft
+
+
+class CartTableModel:
+    """
+    Modelo del lado cliente para la tabla del carrito.
+
+    En vez de reconstruir todas las filas en cada escaneo aplica deltas sobre
+    el DataTable existente (fila nueva, cambio de cantidad, fila eliminada) y
+    lleva el total acumulado. sync() vuelve a cargar todo desde la BD y solo
+    se usa a pedido (al entrar a la pantalla del carrito).
+    """
+
+    def __init__(
+        self,
+        table: ft.DataTable,
+        total_text: ft.Text,
+        on_delete: Callable[[int], None],
+    ):
+        self.table = table
+        self.total_text = total_text
+        self._on_delete = on_delete
+        # cart_item_id -> [DataRow, cantidad, precio unitario]
+        self._lines: dict[int, list] = {}
+        self.total = 0.0
+
+    # ---- deltas ----
+
+    def apply_line(self, cart_item_id: int, name: str, quantity: int, unit_price: float):
+        """Inserta la línea o actualiza su cantidad/subtotal si ya está en la tabla."""
+        line = self._lines.get(cart_item_id)
+        if line is None:
+            row = self._build_row(cart_item_id, name, quantity, unit_price)
+            self._lines[cart_item_id] = [row, quantity, unit_price]
+            self.table.rows.append(row)
+            self.total += quantity * unit_price
+        else:
+            row, old_qty, old_price = line
+            self.total += quantity * unit_price - old_qty * old_price
+            line[1], line[2] = quantity, unit_price
+            row.cells[1].content.value = str(quantity)
+            row.cells[2].content.value = f"{unit_price:,.2f}"
+            row.cells[3].content.value = f"{quantity * unit_price:,.2f}"
+        self._update_total()
+
+    def remove_line(self, cart_item_id: int):
+        line = self._lines.pop(cart_item_id, None)
+        if line is None:
+            return
+        row, qty, price = line
+        self.table.rows.remove(row)
+        self.total -= qty * price
+        self._update_total()
+
+    # ---- re-sincronización ----
+
+    def sync(self, items):
+        """Reconstruye la tabla a partir de las filas de Database.get_cart_items."""
+        self._lines.clear()
+        self.table.rows.clear()
+        self.total = 0.0
+        for it in items:
+            self.apply_line(
+                it["id"], it["name"], int(it["quantity"]), float(it["unit_price"])
+            )
+        self._update_total()
+
+    def clear(self):
+        self.sync([])
+
+    # ---- internos ----
+
+    def _update_total(self):
+        # Evita arrastrar -0.00 por redondeo al vaciar el carrito
+        if not self._lines:
+            self.total = 0.0
+        self.total_text.value = f"Total: {self.total:,.2f} Gs."
+
+    def _build_row(self, cart_item_id: int, name: str, quantity: int, unit_price: float):
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(ft.Text(name)),
+                ft.DataCell(ft.Text(str(quantity))),
+                ft.DataCell(ft.Text(f"{unit_price:,.2f}")),
+                ft.DataCell(ft.Text(f"{quantity * unit_price:,.2f}")),
+                ft.DataCell(
+                    ft.IconButton(
+                        icon=ft.Icons.DELETE,
+                        tooltip="Eliminar",
+                        on_click=lambda e, cid=cart_item_id: self._on_delete(cid),
+                    )
+                ),
+            ]
+        )
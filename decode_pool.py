@@ -0,0 +1,344 @@
+import atexit
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from decoder import PRODUCT_SYMBOLS, QR_SYMBOLS, FrameDecoder
+
+log = logging.getLogger(__name__)
+
+# Simbologías por modo (los workers arman su propio FrameDecoder por modo)
+MODE_SYMBOLS = {"qr": QR_SYMBOLS, "barcode": PRODUCT_SYMBOLS}
+
+# Tamaño de cada slot de memoria compartida: alcanza para 1920x1080 BGR
+DEFAULT_SLOT_BYTES = 1920 * 1080 * 3
+
+
+def _worker_main(slot_names: list[str], tasks, results):
+    """
+    Proceso decodificador: lee (tarea, slot, forma, dtype, modo) de `tasks`,
+    arma una vista numpy sobre el slot compartido (sin copiar ni picklear el
+    frame) y devuelve los códigos por `results`. ("release", stream) suelta
+    los decoders de un stream cerrado: como cada worker tiene su propia cola,
+    llega después de todas las tareas de ese stream que le tocaron.
+    """
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    decoders: dict[tuple[int, str], FrameDecoder] = {}
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            if task[0] == "release":
+                for key in [key for key in decoders if key[0] == task[1]]:
+                    del decoders[key]
+                continue
+            task_id, stream_id, slot, shape, dtype, mode = task
+            try:
+                frame = np.ndarray(shape, dtype=dtype, buffer=slots[slot].buf)
+                # Un decoder por stream para que el conteo de fallos del ROI sea por cámara
+                decoder = decoders.get((stream_id, mode))
+                if decoder is None:
+                    decoder = FrameDecoder(MODE_SYMBOLS[mode])
+                    decoders[(stream_id, mode)] = decoder
+                codes = decoder.decode(frame)
+                del frame
+                results.put((task_id, stream_id, slot, codes, None))
+            except Exception as ex:  # noqa: BLE001 - se informa al proceso principal
+                results.put((task_id, stream_id, slot, [], repr(ex)))
+    finally:
+        for shm in slots:
+            shm.close()
+
+
+class ProcessDecodePool:
+    """
+    Backend opcional de decodificación en procesos.
+
+    pyzbar/OpenCV en un hilo compiten por el GIL con el loop de Flet; acá cada
+    frame se copia a un slot de multiprocessing.shared_memory y solo viaja por
+    la cola la metadata (slot, forma, modo). Los resultados vuelven por otra
+    cola y se reparten por stream, así varias cámaras decodifican en
+    paralelo sobre todos los núcleos.
+
+    Cada worker tiene su cola de tareas y se le da la tarea al que tenga
+    menos en vuelo, así se sabe qué slots tiene cada uno. Si un worker muere
+    se recuperan sus slots y se lo reinicia; después de MAX_WORKER_RESTARTS
+    el pool queda `failed` y los PooledDecoder decodifican en su hilo.
+    """
+
+    # Cada cuánto el colector revisa que los workers sigan vivos
+    HEALTH_CHECK_S = 0.5
+    MAX_WORKER_RESTARTS = 3
+
+    def __init__(
+        self,
+        workers: int = 2,
+        slots: int | None = None,
+        slot_bytes: int = DEFAULT_SLOT_BYTES,
+    ):
+        self.workers = max(1, workers)
+        self.slot_bytes = slot_bytes
+        self._ctx = mp.get_context("spawn")
+        self._shms = [
+            shared_memory.SharedMemory(create=True, size=slot_bytes)
+            for _ in range(slots or self.workers * 2)
+        ]
+        self._free_slots: queue.Queue[int] = queue.Queue()
+        for idx in range(len(self._shms)):
+            self._free_slots.put(idx)
+
+        self._results = self._ctx.Queue()
+        self._task_ids = itertools.count()
+        self._stream_ids = itertools.count()
+        self._streams: dict[int, queue.Queue] = {}
+        # task_id -> (worker, slot) de lo que está en vuelo
+        self._in_flight: dict[int, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.failed = False
+        self.errors = 0
+        self.restarts = 0
+
+        self._queues: list = [None] * self.workers
+        self._procs: list = [None] * self.workers
+        self._worker_tasks: list[set[int]] = [set() for _ in range(self.workers)]
+        for idx in range(self.workers):
+            self._start_worker(idx)
+        self._collector = threading.Thread(
+            target=self._collect, name="decode-results", daemon=True
+        )
+        self._collector.start()
+
+    def decoder(self, mode: str) -> "PooledDecoder":
+        stream_id = next(self._stream_ids)
+        with self._lock:
+            self._streams[stream_id] = queue.Queue()
+        return PooledDecoder(self, stream_id, mode)
+
+    def submit(self, stream_id: int, mode: str, frame) -> bool:
+        """Copia el frame a un slot libre y lo encola. False si no hay slot libre."""
+        if self._closed or self.failed or frame.nbytes > self.slot_bytes:
+            return False
+        try:
+            slot = self._free_slots.get_nowait()
+        except queue.Empty:
+            return False
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shms[slot].buf)
+        view[...] = frame
+        del view
+        with self._lock:
+            # Stream ya liberado (un decode que terminó después de close())
+            if stream_id not in self._streams or self._closed:
+                self._free_slots.put(slot)
+                return False
+            worker = min(range(self.workers), key=lambda i: len(self._worker_tasks[i]))
+            task_id = next(self._task_ids)
+            self._in_flight[task_id] = (worker, slot)
+            self._worker_tasks[worker].add(task_id)
+            self._queues[worker].put(
+                (task_id, stream_id, slot, frame.shape, frame.dtype.str, mode)
+            )
+        return True
+
+    def release_stream(self, stream_id: int):
+        """Olvida el stream acá y en los workers (sueltan su decoder)."""
+        with self._lock:
+            if self._streams.pop(stream_id, None) is None or self._closed:
+                return
+            for tasks in self._queues:
+                if tasks is not None:
+                    tasks.put(("release", stream_id))
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for tasks in self._queues:
+                if tasks is not None:
+                    tasks.put(None)
+        for proc in self._procs:
+            proc.join(timeout=2)
+            if proc.is_alive():
+                proc.terminate()
+        self._results.put(None)
+        self._collector.join(timeout=2)
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        for q in (self._results, *self._queues):
+            if q is not None:
+                q.close()
+
+    def _start_worker(self, idx: int):
+        tasks = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=([shm.name for shm in self._shms], tasks, self._results),
+            name=f"decode-worker-{idx}",
+            daemon=True,
+        )
+        proc.start()
+        self._queues[idx] = tasks
+        self._procs[idx] = proc
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while True:
+            try:
+                item = self._results.get(timeout=self.HEALTH_CHECK_S)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._deliver(*item)
+            if time.monotonic() - last_check >= self.HEALTH_CHECK_S:
+                self._check_workers()
+                last_check = time.monotonic()
+
+    def _deliver(self, task_id: int, stream_id: int, slot: int, codes: list[str], error):
+        with self._lock:
+            entry = self._in_flight.pop(task_id, None)
+            if entry is not None:
+                self._worker_tasks[entry[0]].discard(task_id)
+            stream = self._streams.get(stream_id)
+        # Si ya se recuperó (worker dado por muerto), el slot ya volvió a la cola
+        if entry is not None:
+            self._free_slots.put(slot)
+        if error is not None:
+            self.errors += 1
+        if stream is not None:
+            stream.put(codes)
+
+    def _check_workers(self):
+        with self._lock:
+            if self._closed:
+                return
+            for idx, proc in enumerate(self._procs):
+                if proc.is_alive():
+                    continue
+                # Sus tareas no van a volver: se recuperan los slots
+                lost = self._worker_tasks[idx]
+                for task_id in lost:
+                    self._free_slots.put(self._in_flight.pop(task_id)[1])
+                self.errors += len(lost)
+                lost.clear()
+                if self._queues[idx] is None:
+                    continue
+                # Nadie va a leer esa cola: que no trabe la salida del proceso
+                self._queues[idx].cancel_join_thread()
+                self._queues[idx].close()
+                self._queues[idx] = None
+                if self.failed:
+                    continue
+                if self.restarts >= self.MAX_WORKER_RESTARTS:
+                    self.failed = True
+                    log.warning(
+                        "decode-worker-%d terminó (código %s) y se agotaron los "
+                        "reinicios: se decodifica en el hilo de cada escáner",
+                        idx,
+                        proc.exitcode,
+                    )
+                    continue
+                self.restarts += 1
+                log.warning(
+                    "decode-worker-%d terminó (código %s), reiniciando", idx, proc.exitcode
+                )
+                self._start_worker(idx)
+
+
+class PooledDecoder:
+    """
+    Misma interfaz que FrameDecoder.decode() pero decodificando en el pool.
+
+    decode(frame) encola el frame y devuelve lo que ya hayan terminado los
+    workers para este stream (llega con uno o dos frames de retraso, que para
+    confirmar lecturas por tiempo no importa). Si hay demasiados frames en
+    vuelo espera un resultado antes de seguir, y si no hay slot libre el
+    frame se descarta: siempre se trabaja sobre lo más reciente. Con el
+    pool caído (`failed`) decodifica en el hilo que llama, como FrameDecoder.
+    """
+
+    RESULT_TIMEOUT_S = 1.0
+
+    def __init__(self, pool: ProcessDecodePool, stream_id: int, mode: str):
+        self._pool = pool
+        self.stream_id = stream_id
+        self.mode = mode
+        self.max_in_flight = pool.workers
+        self._in_flight = 0
+        self._fallback: FrameDecoder | None = None
+        with pool._lock:
+            self._results = pool._streams[stream_id]
+
+    def decode(self, frame) -> list[str]:
+        if self._pool.failed:
+            # Sin workers: el mismo decoder, en el hilo que llama
+            if self._fallback is None:
+                self._fallback = FrameDecoder(MODE_SYMBOLS[self.mode])
+            return self._fallback.decode(frame)
+        if self._pool.submit(self.stream_id, self.mode, frame):
+            self._in_flight += 1
+
+        codes: list[str] = []
+        if self._in_flight >= self.max_in_flight:
+            try:
+                codes.extend(self._results.get(timeout=self.RESULT_TIMEOUT_S))
+                self._in_flight = max(0, self._in_flight - 1)
+            except queue.Empty:
+                # Un resultado que no llegó no puede trabar el stream para siempre
+                self._in_flight = max(0, self._in_flight - 1)
+        while True:
+            try:
+                codes.extend(self._results.get_nowait())
+                self._in_flight = max(0, self._in_flight - 1)
+            except queue.Empty:
+                break
+        return codes
+
+    def close(self):
+        self._pool.release_stream(self.stream_id)
+
+
+_pool: ProcessDecodePool | None = None
+_pool_lock = threading.Lock()
+
+
+def configured_workers() -> int:
+    """Workers configurados en SCAN_DECODE_WORKERS (0 = decodificar en el hilo)."""
+    try:
+        return max(0, int(os.environ.get("SCAN_DECODE_WORKERS", "0")))
+    except ValueError:
+        return 0
+
+
+def get_decode_pool() -> ProcessDecodePool | None:
+    """Pool compartido por todo el proceso, o None si está desactivado."""
+    global _pool
+    workers = configured_workers()
+    if workers == 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessDecodePool(workers)
+            # Sin esto quedan workers vivos y segmentos en /dev/shm al salir
+            atexit.register(close_decode_pool)
+        return _pool
+
+
+def close_decode_pool():
+    """Cierra el pool compartido (workers y memoria compartida), si se creó."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,152 @@
+import time
+
+import cv2
+from pyzbar.pyzbar import ZBarSymbol, decode
+
+# Simbologías de cada modo de escaneo
+QR_SYMBOLS = (ZBarSymbol.QRCODE,)
+PRODUCT_SYMBOLS = (ZBarSymbol.EAN13, ZBarSymbol.EAN8, ZBarSymbol.UPCA)
+
+
+class FrameDecoder:
+    """
+    Etapa de decodificación de un modo de escaneo.
+
+    pyzbar sobre el frame BGR completo buscando todas las simbologías es el
+    camino más caro en los kioscos. Acá:
+    - se pasa a escala de grises (con un frame BGR pyzbar se queda solo con
+      el canal azul y además copia un array no contiguo)
+    - se decodifica solo la región central (roi_fraction del ancho/alto),
+      donde el usuario apunta el código
+    - se limitan las simbologías a las del modo
+    - recién después de full_frame_after fallos seguidos se prueba el frame
+      completo, por si el código quedó fuera del centro
+    """
+
+    ROI_FRACTION = 0.6
+    FULL_FRAME_AFTER = 8
+
+    def __init__(
+        self,
+        symbols=None,
+        roi_fraction: float | None = None,
+        full_frame_after: int | None = None,
+    ):
+        self.symbols = list(symbols) if symbols else None
+        self.roi_fraction = self.ROI_FRACTION if roi_fraction is None else roi_fraction
+        self.full_frame_after = (
+            self.FULL_FRAME_AFTER if full_frame_after is None else full_frame_after
+        )
+        self._misses = 0
+
+        # Estadísticas
+        self.frames = 0
+        self.roi_hits = 0
+        self.full_hits = 0
+        self.total_ms = 0.0
+
+    def decode(self, frame) -> list[str]:
+        """Devuelve los datos (texto) de los códigos encontrados en el frame."""
+        start = time.perf_counter()
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        use_roi = 0 < self.roi_fraction < 1 and self._misses < self.full_frame_after
+        region = self.crop_center(gray) if use_roi else gray
+        results = decode(region, symbols=self.symbols)
+
+        if results:
+            self._misses = 0
+            if use_roi:
+                self.roi_hits += 1
+            else:
+                self.full_hits += 1
+        elif use_roi:
+            self._misses += 1
+        else:
+            # Ya probamos el frame completo: volvemos al ROI
+            self._misses = 0
+
+        self.frames += 1
+        self.total_ms += (time.perf_counter() - start) * 1000
+        return [r.data.decode("utf-8") for r in results]
+
+    def crop_center(self, gray):
+        h, w = gray.shape[:2]
+        rh, rw = int(h * self.roi_fraction), int(w * self.roi_fraction)
+        top, left = (h - rh) // 2, (w - rw) // 2
+        return gray[top:top + rh, left:left + rw]
+
+    def close(self):
+        """Nada que liberar (misma interfaz que decode_pool.PooledDecoder)."""
+
+    @property
+    def ms_per_frame(self) -> float:
+        return self.total_ms / self.frames if self.frames else 0.0
+
+
+def qr_decoder() -> FrameDecoder:
+    return FrameDecoder(QR_SYMBOLS)
+
+
+def product_decoder() -> FrameDecoder:
+    return FrameDecoder(PRODUCT_SYMBOLS)
+
+
+class ScanConfirmer:
+    """
+    Confirma lecturas por tiempo (no por cantidad de frames), así no depende
+    de los FPS de la cámara, y evita agregar dos veces el mismo producto.
+
+    - un código se confirma cuando se lo ve de forma continua durante
+      CONFIRM_S (huecos de hasta MAX_GAP_S no cortan la racha)
+    - mientras siga a la vista no se vuelve a confirmar
+    - si sale de cuadro y vuelve, se confirma de nuevo (segunda unidad del
+      mismo producto) pero nunca antes de COOLDOWN_S desde el último alta
+    """
+
+    CONFIRM_S = 0.2
+    MAX_GAP_S = 0.4
+    COOLDOWN_S = 1.5
+
+    def __init__(
+        self,
+        confirm_s: float | None = None,
+        max_gap_s: float | None = None,
+        cooldown_s: float | None = None,
+    ):
+        self.confirm_s = self.CONFIRM_S if confirm_s is None else confirm_s
+        self.max_gap_s = self.MAX_GAP_S if max_gap_s is None else max_gap_s
+        self.cooldown_s = self.COOLDOWN_S if cooldown_s is None else cooldown_s
+        # código -> [inicio de la racha, última vez visto, racha ya confirmada]
+        self._streaks: dict[str, list] = {}
+        self._last_confirmed: dict[str, float] = {}
+
+    def feed(self, codes, now: float | None = None) -> list[str]:
+        """Registra las lecturas de un frame y devuelve los códigos recién confirmados."""
+        now = time.monotonic() if now is None else now
+        confirmed = []
+        for code in dict.fromkeys(codes):
+            streak = self._streaks.get(code)
+            if streak is None or now - streak[1] > self.max_gap_s:
+                streak = [now, now, False]
+                self._streaks[code] = streak
+            streak[1] = now
+
+            if streak[2] or now - streak[0] < self.confirm_s:
+                continue
+            streak[2] = True
+            last = self._last_confirmed.get(code)
+            if last is not None and now - last < self.cooldown_s:
+                continue
+            self._last_confirmed[code] = now
+            confirmed.append(code)
+
+        self._prune(now)
+        return confirmed
+
+    def _prune(self, now: float):
+        horizon = max(self.max_gap_s, self.cooldown_s)
+        for code in [c for c, s in self._streaks.items() if now - s[1] > horizon]:
+            del self._streaks[code]
+        for code in [c for c, t in self._last_confirmed.items() if now - t > horizon]:
+            del self._last_confirmed[code]
@@ -0,0 +1,215 @@
+"""
+Fuentes de frames intercambiables con cv2.VideoCapture.
+
+Permiten correr el escáner sin webcam: un directorio de imágenes (PNG/JPG,
+como barcodes_png/; los SVG solo si está cairosvg) o un archivo de video.
+Todas exponen isOpened() / read() / grab() / release(), así CameraService
+las usa igual que a la cámara.
+"""
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+try:  # opcional: solo para renderizar los SVG de barcodes_svg/
+    import cairosvg
+except ImportError:  # pragma: no cover - depende del entorno
+    cairosvg = None
+
+from barcodes import gtin_check_digit
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp")
+# Tamaño de un frame de webcam típico para las imágenes "pegadas"
+FRAME_SIZE = (640, 480)
+# Alto del código dentro del frame (fracción del alto del frame)
+CODE_SCALE = 0.4
+
+
+def load_image(path: Path):
+    """Lee una imagen BGR; los SVG se renderizan con cairosvg si está instalado."""
+    if path.suffix.lower() == ".svg":
+        if cairosvg is None:
+            return None
+        png = cairosvg.svg2png(url=str(path), output_width=600, background_color="white")
+        return cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_COLOR)
+    if path.suffix.lower() in IMAGE_SUFFIXES:
+        return cv2.imread(str(path))
+    return None
+
+
+def compose_frame(image, size: tuple[int, int] = FRAME_SIZE, background: int = 128):
+    """Pega la imagen centrada sobre un fondo liso del tamaño de un frame de cámara."""
+    width, height = size
+    frame = np.full((height, width, 3), background, dtype=np.uint8)
+    h, w = image.shape[:2]
+    scale = min(height * CODE_SCALE / h, width * 0.9 / w)
+    image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))))
+    h, w = image.shape[:2]
+    top, left = (height - h) // 2, (width - w) // 2
+    frame[top:top + h, left:left + w] = image
+    return frame
+
+
+def barcode_file_label(path: Path) -> str | None:
+    """
+    Valor que debería leerse de barcodes_svg/<id>_<digitos>.svg (o del PNG
+    del mismo nombre en barcodes_png/).
+
+    barcode_generator.py usa python-barcode, que recalcula el dígito
+    verificador: el código impreso son los 12 primeros dígitos + el DV.
+    """
+    digits = path.stem.split("_", 1)[-1]
+    if not digits.isdigit() or len(digits) not in (12, 13):
+        return None
+    body = digits[:12]
+    return body + str(gtin_check_digit(body))
+
+
+class _PacedSource:
+    """Con fps se simula el ritmo de una cámara real; sin fps, lo más rápido posible."""
+
+    fps: float | None = None
+    _next_due = 0.0
+
+    def _pace(self):
+        if not self.fps:
+            return
+        now = time.perf_counter()
+        if now < self._next_due:
+            time.sleep(self._next_due - now)
+        self._next_due = max(now, self._next_due) + 1.0 / self.fps
+
+
+class ImageDirSource(_PacedSource):
+    """
+    Directorio de imágenes servido como un stream de cámara.
+
+    Cada imagen se repite frames_per_image frames (el código "frente a la
+    cámara") seguida de gap_frames frames vacíos (se retira el producto).
+    `label` es el valor esperado del último frame leído (None en los vacíos),
+    `labels` mapea nombre de archivo -> valor esperado.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        frames_per_image: int = 15,
+        gap_frames: int = 10,
+        fps: float | None = None,
+        loop: bool = False,
+        labels: dict[str, str] | None = None,
+        size: tuple[int, int] = FRAME_SIZE,
+    ):
+        self.directory = Path(directory)
+        self.frames_per_image = frames_per_image
+        self.gap_frames = gap_frames
+        self.fps = fps
+        self.loop = loop
+        self.size = size
+        self.labels = labels or {}
+        self.label: str | None = None
+
+        self._items: list[tuple[str | None, object]] = []
+        for path in sorted(self.directory.iterdir()):
+            image = load_image(path)
+            if image is None:
+                continue
+            label = self.labels.get(path.name)
+            if label is None:
+                label = barcode_file_label(path)
+            self._items.append((label, compose_frame(image, size)))
+        width, height = size
+        self._blank = np.full((height, width, 3), 128, dtype=np.uint8)
+        self._pos = 0
+        self._open = bool(self._items)
+
+    @property
+    def images(self) -> int:
+        return len(self._items)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self._items) * (self.frames_per_image + self.gap_frames)
+
+    def isOpened(self) -> bool:  # noqa: N802 - misma interfaz que cv2.VideoCapture
+        return self._open
+
+    def grab(self) -> bool:
+        ok, _ = self.read()
+        return ok
+
+    def read(self):
+        if not self._open:
+            return False, None
+        if self._pos >= self.frame_count:
+            if not self.loop:
+                return False, None
+            self._pos = 0
+        self._pace()
+        per_item = self.frames_per_image + self.gap_frames
+        item, offset = divmod(self._pos, per_item)
+        self._pos += 1
+        if offset < self.frames_per_image:
+            self.label, frame = self._items[item]
+        else:
+            self.label, frame = None, self._blank
+        return True, frame.copy()
+
+    def release(self):
+        self._open = False
+
+
+class VideoFileSource(_PacedSource):
+    """Archivo de video (cv2.VideoCapture) con la opción de repetirlo en loop."""
+
+    def __init__(self, path: str | Path, fps: float | None = None, loop: bool = False):
+        self.path = str(path)
+        self.fps = fps
+        self.loop = loop
+        self.label: str | None = None
+        self._cap = cv2.VideoCapture(self.path)
+
+    def isOpened(self) -> bool:  # noqa: N802
+        return self._cap.isOpened()
+
+    def grab(self) -> bool:
+        self._pace()
+        ok = self._cap.grab()
+        if not ok and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok = self._cap.grab()
+        return ok
+
+    def read(self):
+        self._pace()
+        ok, frame = self._cap.read()
+        if not ok and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._cap.read()
+        return ok, frame
+
+    def release(self):
+        self._cap.release()
+
+
+def open_frame_source(spec: int | str | Path, fps: float | None = None, loop: bool = False):
+    """
+    Abre la fuente indicada:
+    - int (o texto numérico): índice de cámara para cv2.VideoCapture
+    - directorio: ImageDirSource
+    - archivo: VideoFileSource
+    fps y loop solo aplican a las fuentes grabadas.
+    """
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return cv2.VideoCapture(int(spec))
+    path = Path(spec)
+    if path.is_dir():
+        return ImageDirSource(path, fps=fps, loop=loop)
+    return VideoFileSource(path, fps=fps, loop=loop)
+
+
+def configured_source() -> int | str:
+    """Fuente del escáner: SCAN_SOURCE (índice, directorio o video); por defecto la cámara 0."""
+    return os.environ.get("SCAN_SOURCE", "").strip() or 0
@@ -0,0 +1,165 @@
+"""
+Posteo de stock por documento (ventas y compras).
+
+Los triggers originales de detalle_ventas / detalle_compras actualizan
+productos y escriben movimientos_inventario fila por fila (con dos
+subconsultas que vuelven a leer el stock). post_stock() aplica un documento
+completo en dos sentencias: los movimientos de todas las líneas y un UPDATE
+de productos con la cantidad agregada por producto.
+
+Mientras el documento está en STAGING_STATE los triggers por fila no hacen
+nada; fuera de ese estado siguen funcionando igual que antes (fallback para
+los módulos que insertan detalle línea por línea).
+"""
+import sqlite3
+from typing import NamedTuple
+
+# Estado de ventas / compras mientras se cargan en bloque
+STAGING_STATE = "procesando"
+
+
+class StockDocument(NamedTuple):
+    header: str      # tabla cabecera (ventas / compras)
+    detail: str      # tabla de líneas
+    fk: str          # columna de la línea que apunta a la cabecera
+    movement: str    # tipo_movimiento en movimientos_inventario
+    sign: str        # "-" descuenta stock, "+" lo suma
+
+
+VENTA = StockDocument("ventas", "detalle_ventas", "venta_id", "venta", "-")
+COMPRA = StockDocument("compras", "detalle_compras", "compra_id", "compra", "+")
+
+
+def post_stock(conn: sqlite3.Connection | sqlite3.Cursor, doc: StockDocument, doc_id: int) -> int:
+    """
+    Aplica el documento a productos y movimientos_inventario.
+    Devuelve la cantidad de movimientos escritos (una por línea). Debe correr
+    dentro de la misma transacción que insertó el detalle.
+    """
+    op = doc.sign
+    # Un movimiento por línea; el stock anterior/nuevo de cada una descuenta las
+    # líneas previas del mismo producto (suma acumulada por ventana). El "+" en
+    # PARTITION BY / GROUP BY evita que el planner recorra todo el detalle por
+    # el índice de producto en lugar de buscar por el del documento.
+    movements = conn.execute(
+        f"""
+        INSERT INTO movimientos_inventario (
+            producto_id, tipo_movimiento, cantidad,
+            stock_anterior, stock_nuevo, referencia_id, usuario_id
+        )
+        SELECT
+            d.producto_id,
+            '{doc.movement}',
+            d.cantidad,
+            p.stock {op} (d.acumulado - d.cantidad),
+            p.stock {op} d.acumulado,
+            d.{doc.fk},
+            h.usuario_id
+        FROM (
+            SELECT id, {doc.fk}, producto_id, cantidad,
+                   SUM(cantidad) OVER (PARTITION BY +producto_id ORDER BY id) AS acumulado
+            FROM {doc.detail}
+            WHERE {doc.fk} = ?
+        ) AS d
+        JOIN productos AS p ON p.id = d.producto_id
+        JOIN {doc.header} AS h ON h.id = d.{doc.fk}
+        ORDER BY d.id
+        """,
+        (doc_id,),
+    ).rowcount
+
+    # Un solo UPDATE por producto, con la cantidad total del documento
+    conn.execute(
+        f"""
+        UPDATE productos
+        SET stock = stock {op} t.cantidad,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT producto_id, SUM(cantidad) AS cantidad
+            FROM {doc.detail}
+            WHERE {doc.fk} = ?
+            GROUP BY +producto_id
+        ) AS t
+        WHERE productos.id = t.producto_id
+        """,
+        (doc_id,),
+    )
+    return movements
+
+
+def post_sale(conn, venta_id: int) -> int:
+    return post_stock(conn, VENTA, venta_id)
+
+
+def post_purchase(conn, compra_id: int) -> int:
+    return post_stock(conn, COMPRA, compra_id)
+
+
+def _row_trigger(name: str, doc: StockDocument) -> str:
+    """
+    Trigger por fila compatible con el original: primero el movimiento (con el
+    stock previo) y después el UPDATE, sin volver a leer productos.stock.
+    """
+    return f"""
+        CREATE TRIGGER {name}
+        AFTER INSERT ON {doc.detail}
+        WHEN (SELECT estado FROM {doc.header} WHERE id = NEW.{doc.fk}) IS NOT '{STAGING_STATE}'
+        BEGIN
+            INSERT INTO movimientos_inventario (
+                producto_id, tipo_movimiento, cantidad,
+                stock_anterior, stock_nuevo, referencia_id, usuario_id
+            )
+            SELECT
+                p.id,
+                '{doc.movement}',
+                NEW.cantidad,
+                p.stock,
+                p.stock {doc.sign} NEW.cantidad,
+                NEW.{doc.fk},
+                (SELECT usuario_id FROM {doc.header} WHERE id = NEW.{doc.fk})
+            FROM productos AS p
+            WHERE p.id = NEW.producto_id;
+
+            UPDATE productos
+            SET stock = stock {doc.sign} NEW.cantidad,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = NEW.producto_id;
+        END
+    """
+
+
+def _totals_trigger(name: str, doc: StockDocument, discount: bool) -> str:
+    """Re-suma de totales por fila, salvo para documentos en carga en bloque."""
+    descuento = (
+        f" - COALESCE((SELECT descuento FROM {doc.header} WHERE id = NEW.{doc.fk}), 0)"
+        if discount
+        else ""
+    )
+    return f"""
+        CREATE TRIGGER {name}
+        AFTER INSERT ON {doc.detail}
+        WHEN (SELECT estado FROM {doc.header} WHERE id = NEW.{doc.fk}) IS NOT '{STAGING_STATE}'
+        BEGIN
+            UPDATE {doc.header}
+            SET subtotal = (
+                SELECT SUM(subtotal) FROM {doc.detail} WHERE {doc.fk} = NEW.{doc.fk}
+            ),
+            total = (
+                SELECT SUM(subtotal) FROM {doc.detail} WHERE {doc.fk} = NEW.{doc.fk}
+            ){descuento}
+            WHERE id = NEW.{doc.fk};
+        END
+    """
+
+
+# Triggers de detalle que reemplazan a los del esquema original
+TRIGGERS = {
+    "tr_after_insert_detalle_venta": _row_trigger("tr_after_insert_detalle_venta", VENTA),
+    "tr_after_insert_detalle_venta_totales": _totals_trigger(
+        "tr_after_insert_detalle_venta_totales", VENTA, discount=True
+    ),
+    "tr_after_insert_detalle_compra": _row_trigger("tr_after_insert_detalle_compra", COMPRA),
+    "tr_after_insert_detalle_compra_totales": _totals_trigger(
+        "tr_after_insert_detalle_compra_totales", COMPRA, discount=False
+    ),
+}
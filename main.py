@@ -1,19 +1,72 @@
 import flet as ft
+import argparse
+import asyncio
+import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 import threading
-import cv2
-from pyzbar.pyzbar import decode
-import datetime
-import base64
 import time
+from typing import NamedTuple
+import datetime
+import re
+
+import inventory
+import metrics
+import sales_summary
+from async_db import AsyncDatabase, configured_workers as configured_db_workers
+from barcodes import (
+    InvalidBarcode,
+    barcode_prefix_ranges,
+    has_valid_check_digit,
+    normalize_barcode,
+)
+from camera import CameraService, ScanWorker
+from cart_view import CartTableModel
+from decode_pool import PooledDecoder, get_decode_pool
+from decoder import FrameDecoder, ScanConfirmer, product_decoder, qr_decoder
+from frame_sources import configured_source
+from metrics import FAST_BUCKETS_MS, METRICS, LatencyHistogram
+from preview import PreviewEncoder
+from product_index import ListingCache, ProductIndex
+from search_pipeline import SearchPipeline
+from tickets import TicketAllocator
 
 
 # ================== CAPA DE DATOS (SQLite) ==================
 
+PRODUCT_PAGE_SIZE = 50
+FTS_RANK_MIN_CHARS = 3
+
+
+def fts_prefix_query(search: str) -> str:
+    """
+    Convierte el texto del buscador en una consulta FTS5 de prefijos:
+    'aceite gira' -> '"aceite"* "gira"*' (todas las palabras, por prefijo).
+    """
+    tokens = re.findall(r"\w+", search)
+    return " ".join(f'"{token}"*' for token in tokens)
+
 
+class CheckoutContext(NamedTuple):
+    """Usuario, caja y apertura con los que se registran las ventas de una caja."""
+    usuario_id: int
+    caja_id: int
+    caja_numero: int
+    apertura_id: int
+
+
+# Cada método público queda medido en db_call_ms{method=...} (ver metrics)
+@metrics.instrument_methods("db_call_ms")
 class Database:
-    def __init__(self, db_path: str | None = None):
+    # Ajustes de cada conexión del pool (caché en KiB, mmap en bytes)
+    CACHE_SIZE_KIB = 16 * 1024
+    MMAP_SIZE = 64 * 1024 * 1024
+    BUSY_TIMEOUT_S = 5.0
+    CACHED_STATEMENTS = 256
+
+    def __init__(self, db_path: str | None = None, listing_cache_size: int = 0):
         # Usa ./database/supermarket.db
         if db_path is None:
             base_dir = Path(__file__).resolve().parent / "database"
@@ -22,11 +75,75 @@ class Database:
         else:
             self.db_path = Path(db_path)
 
-    def _get_conn(self):
-        conn = sqlite3.connect(self.db_path)
+        # Pool de conexiones: una conexión larga por hilo
+        self._local = threading.local()
+        self._conns: dict[int, tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._conns_lock = threading.Lock()
+
+        # Índice en memoria codigo_barr -> producto para los escaneos
+        self.product_index = ProductIndex(self._get_conn)
+        # Páginas del listado compartidas entre sesiones (0 = sin caché)
+        self.listing_cache = ListingCache(listing_cache_size) if listing_cache_size else None
+        # Números de ticket por bloques reservados en ticket_secuencias
+        self.tickets = TicketAllocator(self._get_conn)
+        # Contexto de checkout por número de caja (ver checkout_context)
+        self._checkout_contexts: dict[int | None, CheckoutContext] = {}
+        self._checkout_lock = threading.Lock()
+
+    def _open_conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.BUSY_TIMEOUT_S,
+            cached_statements=self.CACHED_STATEMENTS,
+            check_same_thread=False,
+        )
         conn.row_factory = sqlite3.Row
+        # WAL: lectores y escritor no se bloquean entre sí; NORMAL evita fsync por commit
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{self.CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size={self.MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
         return conn
 
+    def _get_conn(self):
+        """
+        Devuelve la conexión del hilo actual (la crea la primera vez).
+        La conexión queda abierta, así el caché de sentencias preparadas
+        y el caché de páginas se reutilizan entre escaneos.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_conn()
+            self._local.conn = conn
+            current = threading.current_thread()
+            with self._conns_lock:
+                self._prune_dead_conns()
+                self._conns[current.ident] = (current, conn)
+        return conn
+
+    def _prune_dead_conns(self):
+        # Los hilos de escaneo son efímeros: cerramos las conexiones que dejaron
+        for ident, (thread, conn) in list(self._conns.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._conns[ident]
+
+    def interrupt(self, thread: threading.Thread):
+        """Interrumpe la consulta que esté corriendo en la conexión de ese hilo."""
+        with self._conns_lock:
+            entry = self._conns.get(thread.ident)
+        if entry is not None:
+            entry[1].interrupt()
+
+    def close(self):
+        """Cierra todas las conexiones del pool."""
+        with self._conns_lock:
+            for _thread, conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+        self._local = threading.local()
+
     def init_schema_and_seed(self):
         """
         NO tocamos tus tablas grandes (usuarios, cajas, productos, ventas, etc.).
@@ -95,6 +212,122 @@ class Database:
             )
             # NOTA: el FK a productos no lo forzamos para evitar conflictos con tu esquema.
 
+            # Líneas de un carrito y búsqueda de la línea de un producto
+            # (add_item_to_cart, get_cart_items, checkout): sin esto cada escaneo
+            # recorre toda la tabla, que solo crece. Es UNIQUE para que
+            # add_item_to_cart sea un solo UPSERT.
+            self._migrate_cart_items_unique(cur)
+
+            # Refresco incremental del índice de productos (ProductIndex)
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_productos_updated_at ON productos(updated_at)"
+            )
+
+            # Listado paginado ordenado por descripción
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_productos_descripcion ON productos(descripcion)"
+            )
+
+            # Búsqueda de texto completo sobre productos.descripcion
+            cur.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'productos_fts'"
+            )
+            fts_exists = cur.fetchone() is not None
+            cur.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+                    descripcion,
+                    content = 'productos',
+                    content_rowid = 'id',
+                    prefix = '1 2 3',
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+                """
+            )
+            # Triggers que mantienen productos_fts sincronizada con productos
+            cur.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS tr_productos_fts_insert
+                AFTER INSERT ON productos
+                BEGIN
+                    INSERT INTO productos_fts (rowid, descripcion)
+                    VALUES (NEW.id, NEW.descripcion);
+                END
+                """
+            )
+            cur.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS tr_productos_fts_delete
+                AFTER DELETE ON productos
+                BEGIN
+                    INSERT INTO productos_fts (productos_fts, rowid, descripcion)
+                    VALUES ('delete', OLD.id, OLD.descripcion);
+                END
+                """
+            )
+            # Solo ante cambios de descripción (no en cada update de stock)
+            cur.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS tr_productos_fts_update
+                AFTER UPDATE OF descripcion ON productos
+                BEGIN
+                    INSERT INTO productos_fts (productos_fts, rowid, descripcion)
+                    VALUES ('delete', OLD.id, OLD.descripcion);
+                    INSERT INTO productos_fts (rowid, descripcion)
+                    VALUES (NEW.id, NEW.descripcion);
+                END
+                """
+            )
+            if not fts_exists:
+                # Primera vez: indexar el catálogo existente
+                cur.execute("INSERT INTO productos_fts (productos_fts) VALUES ('rebuild')")
+
+            # Triggers de stock y totales del detalle de ventas/compras: no hacen
+            # nada mientras el documento está en carga en bloque (ver inventory.py)
+            for name, sql in inventory.TRIGGERS.items():
+                self._ensure_object(cur, "trigger", name, sql)
+
+            # El cierre de caja cierra su apertura: las ventas en curso con esa
+            # apertura fallan el chequeo de create_sale_from_cart y resuelven otra
+            self._ensure_object(
+                cur,
+                "trigger",
+                "tr_after_insert_cierre_caja",
+                """
+                CREATE TRIGGER tr_after_insert_cierre_caja
+                AFTER INSERT ON cierres_caja
+                BEGIN
+                    UPDATE aperturas_caja
+                    SET estado = 'cerrada'
+                    WHERE id = NEW.apertura_id AND estado = 'abierta';
+                END
+                """,
+            )
+
+            # Contador de tickets por caja (TicketAllocator reserva bloques)
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ticket_secuencias (
+                    caja_id INTEGER PRIMARY KEY,
+                    siguiente INTEGER NOT NULL,
+                    FOREIGN KEY(caja_id) REFERENCES cajas(id)
+                )
+                """
+            )
+
+            # Resúmenes diarios de ventas para los tableros (ver sales_summary.py)
+            cur.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ventas_diarias'"
+            )
+            summaries_exist = cur.fetchone() is not None
+            for sql in sales_summary.TABLES:
+                cur.execute(sql)
+            if not summaries_exist:
+                # Primera vez: resumir todo el historial
+                sales_summary.rollup(cur)
+            for name, sql in sales_summary.VIEWS.items():
+                self._ensure_object(cur, "view", name, sql)
+
             # Seed mínimo de users/cash_registers solo si está vacío
             cur.execute("SELECT COUNT(*) AS c FROM users")
             if cur.fetchone()["c"] == 0:
@@ -133,6 +366,84 @@ class Database:
 
             conn.commit()
 
+        # Carga inicial del catálogo en memoria
+        self.product_index.load()
+
+    @staticmethod
+    def _migrate_cart_items_unique(cur: sqlite3.Cursor):
+        """
+        Crea idx_cart_items_cart_product como UNIQUE(cart_id, product_id).
+        En BDs anteriores puede haber líneas repetidas del mismo producto
+        (el alta era SELECT + INSERT sin lock): se suman en la primera línea
+        y se borran las demás antes de crear el índice.
+        """
+        cur.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?",
+            ("idx_cart_items_cart_product",),
+        )
+        row = cur.fetchone()
+        if row is not None and row["sql"].lstrip().upper().startswith("CREATE UNIQUE"):
+            return
+
+        cur.execute(
+            """
+            UPDATE cart_items
+            SET quantity = (
+                SELECT SUM(d.quantity) FROM cart_items AS d
+                WHERE d.cart_id = cart_items.cart_id AND d.product_id = cart_items.product_id
+            )
+            WHERE id IN (
+                SELECT MIN(id) FROM cart_items
+                GROUP BY cart_id, product_id
+                HAVING COUNT(*) > 1
+            )
+            """
+        )
+        cur.execute(
+            """
+            DELETE FROM cart_items
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM cart_items GROUP BY cart_id, product_id
+            )
+            """
+        )
+        cur.execute("DROP INDEX IF EXISTS idx_cart_items_cart_product")
+        cur.execute(
+            """
+            CREATE UNIQUE INDEX idx_cart_items_cart_product
+            ON cart_items(cart_id, product_id)
+            """
+        )
+
+    @staticmethod
+    def _ensure_object(cur: sqlite3.Cursor, kind: str, name: str, sql: str):
+        """Crea el trigger / la vista o lo reemplaza si su definición cambió."""
+        cur.execute(
+            "SELECT sql FROM sqlite_master WHERE type = ? AND name = ?", (kind, name)
+        )
+        row = cur.fetchone()
+        if row is not None and " ".join(row["sql"].split()) == " ".join(sql.split()):
+            return
+        cur.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+        cur.execute(sql)
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Transacción de escritura explícita (BEGIN IMMEDIATE) sobre la conexión
+        del hilo: toma el lock de escritura al empezar, así no falla a mitad
+        de camino por otro escritor, y hace commit o rollback de todo junto.
+        """
+        conn = self._get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
     # ---- Cajas / QR (tabla cash_registers del módulo móvil) ----
     def get_cash_register_by_qr(self, qr_token: str):
         with self._get_conn() as conn:
@@ -146,53 +457,136 @@ class Database:
 
     def get_product_by_barcode(self, barcode: str):
         """
-        Lee de la tabla productos:
+        Busca en el índice en memoria (ProductIndex) sobre la tabla productos:
         - codigo_barr
         - descripcion
         - precio_venta
         - imagen_url
         y devuelve alias compatibles.
         """
-        with self._get_conn() as conn:
-            cur = conn.execute(
-                """
-                SELECT
-                    id,
-                    descripcion AS name,
-                    descripcion AS description,
-                    codigo_barr AS barcode,
-                    precio_venta AS price,
-                    imagen_url AS image_url
-                FROM productos
-                WHERE codigo_barr = ?
-                  AND (activo = 1 OR activo IS NULL)
-                """,
-                (barcode,)
-            )
-            return cur.fetchone()
-
-    def list_products(self, search: str = ""):
+        try:
+            code = normalize_barcode(barcode, validate_check_digit=False)
+        except InvalidBarcode:
+            # Lectura inválida: ni siquiera tocamos la BD
+            return None
+        if not has_valid_check_digit(code):
+            # Algunos códigos internos del catálogo no tienen dígito verificador
+            # válido: se aceptan solo si ya están en memoria, sin consultar la BD.
+            return self.product_index.peek(code)
+        return self.product_index.get(code)
+
+    def list_products(
+        self,
+        search: str = "",
+        limit: int | None = PRODUCT_PAGE_SIZE,
+        offset: int = 0,
+    ):
         """
-        Listado de productos desde tabla productos, con alias compatibles.
+        Listado paginado de productos desde tabla productos, con alias compatibles.
+        - búsqueda numérica: prefijo de codigo_barr (rangos sobre idx_productos_codigo),
+          ordenado por código, y después las descripciones que contienen el número
+        - búsqueda de texto: productos_fts con prefijos, ordenado por relevancia
+        - sin búsqueda: orden alfabético (idx_productos_descripcion)
+        Con listing_cache las páginas se reutilizan mientras el catálogo
+        (ProductIndex) no cambie.
         """
+        search = search.strip()
+        if self.listing_cache is None:
+            return self._query_products(search, limit, offset)
+        key = (search, limit, offset)
+        version = self.product_index.current_version()
+        rows = self.listing_cache.get(key, version)
+        if rows is None:
+            rows = self._query_products(search, limit, offset)
+            self.listing_cache.put(key, version, rows)
+        return rows
+
+    def _query_products(self, search: str, limit: int | None, offset: int):
+        page_params = (-1 if limit is None else limit, offset)
         with self._get_conn() as conn:
-            if search:
-                pattern = f"%{search}%"
-                cur = conn.execute(
+            ranges = barcode_prefix_ranges(search)
+            if ranges:
+                # Primero los códigos que empiezan con esos dígitos (un rango por
+                # largo de código, cada uno recorre idx_productos_codigo en orden y
+                # corta en offset + limit filas); después las descripciones que
+                # contienen el número ("900" -> "ACEITE ... 900ML") por FTS
+                inner_limit = -1 if limit is None else offset + limit
+                in_ranges = " OR ".join("p.codigo_barr BETWEEN ? AND ?" for _ in ranges)
+                union = " UNION ALL ".join(
+                    """
+                    SELECT * FROM (
+                        SELECT 0 AS grupo, codigo_barr AS orden, id
+                        FROM productos
+                        WHERE codigo_barr BETWEEN ? AND ?
+                          AND COALESCE(activo, 1) = 1
+                        ORDER BY codigo_barr
+                        LIMIT ?
+                    )
                     """
+                    for _ in ranges
+                )
+                params = [value for lo, hi in ranges for value in (lo, hi, inner_limit)]
+                order_by = "f.rank" if len(search) >= FTS_RANK_MIN_CHARS else "f.rowid"
+                cur = conn.execute(
+                    f"""
                     SELECT
-                        id,
-                        descripcion AS name,
-                        descripcion AS description,
-                        codigo_barr AS barcode,
-                        precio_venta AS price,
-                        imagen_url AS image_url
-                    FROM productos
-                    WHERE (descripcion LIKE ? OR CAST(codigo_barr AS TEXT) LIKE ?)
-                      AND (activo = 1 OR activo IS NULL)
-                    ORDER BY descripcion
+                        p.id,
+                        p.descripcion AS name,
+                        p.descripcion AS description,
+                        p.codigo_barr AS barcode,
+                        p.precio_venta AS price,
+                        p.imagen_url AS image_url
+                    FROM (
+                        {union}
+                        UNION ALL
+                        SELECT * FROM (
+                            SELECT 1 AS grupo, {order_by} AS orden, p.id
+                            FROM productos_fts f
+                            JOIN productos p ON p.id = f.rowid
+                            WHERE productos_fts MATCH ?
+                              AND COALESCE(p.activo, 1) = 1
+                              AND NOT ({in_ranges})
+                            ORDER BY {order_by}
+                            LIMIT ?
+                        )
+                    ) AS m
+                    JOIN productos p ON p.id = m.id
+                    ORDER BY m.grupo, m.orden
+                    LIMIT ? OFFSET ?
+                    """,
+                    (
+                        *params,
+                        fts_prefix_query(search),
+                        *(value for r in ranges for value in r),
+                        inner_limit,
+                        *page_params,
+                    ),
+                )
+            elif search:
+                match = fts_prefix_query(search)
+                if not match:
+                    return []
+                # Ordenar por relevancia obliga a puntuar todas las coincidencias:
+                # con 1-2 letras (miles de coincidencias y ranking sin sentido)
+                # se devuelve en orden de id, que FTS5 entrega sin ordenar.
+                order_by = "f.rank" if len(search) >= FTS_RANK_MIN_CHARS else "f.rowid"
+                cur = conn.execute(
+                    f"""
+                    SELECT
+                        p.id,
+                        p.descripcion AS name,
+                        p.descripcion AS description,
+                        p.codigo_barr AS barcode,
+                        p.precio_venta AS price,
+                        p.imagen_url AS image_url
+                    FROM productos_fts f
+                    JOIN productos p ON p.id = f.rowid
+                    WHERE productos_fts MATCH ?
+                      AND COALESCE(p.activo, 1) = 1
+                    ORDER BY {order_by}
+                    LIMIT ? OFFSET ?
                     """,
-                    (pattern, pattern),
+                    (match, *page_params),
                 )
             else:
                 cur = conn.execute(
@@ -205,9 +599,11 @@ class Database:
                         precio_venta AS price,
                         imagen_url AS image_url
                     FROM productos
-                    WHERE (activo = 1 OR activo IS NULL)
+                    WHERE COALESCE(activo, 1) = 1
                     ORDER BY descripcion
-                    """
+                    LIMIT ? OFFSET ?
+                    """,
+                    page_params,
                 )
             return cur.fetchall()
 
@@ -227,31 +623,26 @@ class Database:
             return cur.lastrowid
 
     def add_item_to_cart(self, cart_id: int, product_id: int, quantity: int, unit_price: float):
+        """
+        Agrega (o suma cantidad a) la línea del producto en el carrito.
+        Un solo UPSERT atómico sobre UNIQUE(cart_id, product_id): no hay
+        carrera entre el escáner y el ingreso manual sobre el mismo carrito.
+        Devuelve el estado de la línea: id, product_id, quantity, unit_price,
+        o None si el carrito ya no está abierto (cobrado mientras se escaneaba).
+        """
         with self._get_conn() as conn:
-            cur = conn.cursor()
-            # Si ya existe ítem de ese producto, solo sumamos cantidad
-            cur.execute(
+            row = conn.execute(
                 """
-                SELECT id, quantity FROM cart_items
-                WHERE cart_id = ? AND product_id = ?
+                INSERT INTO cart_items (cart_id, product_id, quantity, unit_price)
+                SELECT ?,?,?,?
+                WHERE EXISTS (SELECT 1 FROM carts WHERE id = ? AND status = 'open')
+                ON CONFLICT (cart_id, product_id)
+                DO UPDATE SET quantity = quantity + excluded.quantity
+                RETURNING id, product_id, quantity, unit_price
                 """,
-                (cart_id, product_id),
-            )
-            existing = cur.fetchone()
-            if existing:
-                new_qty = existing["quantity"] + quantity
-                cur.execute(
-                    "UPDATE cart_items SET quantity = ? WHERE id = ?",
-                    (new_qty, existing["id"]),
-                )
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO cart_items (cart_id, product_id, quantity, unit_price)
-                    VALUES (?,?,?,?)
-                    """,
-                    (cart_id, product_id, quantity, unit_price),
-                )
+                (cart_id, product_id, quantity, unit_price, cart_id),
+            ).fetchone()
+            return dict(row) if row is not None else None
 
     def remove_cart_item(self, cart_item_id: int):
         with self._get_conn() as conn:
@@ -293,129 +684,256 @@ class Database:
 
     # ---- Registrar venta real en tus tablas ventas / detalle_ventas ----
 
+    def _resolve_caja(self, caja_numero: int | None) -> sqlite3.Row:
+        """Caja de la venta: la del número escaneado o, si no existe, la primera."""
+        conn = self._get_conn()
+        row_caja = None
+        if caja_numero is not None:
+            row_caja = conn.execute(
+                "SELECT id, numero FROM cajas WHERE numero = ? ORDER BY id LIMIT 1",
+                (caja_numero,),
+            ).fetchone()
+
+        if row_caja is None:
+            row_caja = conn.execute(
+                "SELECT id, numero FROM cajas ORDER BY id LIMIT 1"
+            ).fetchone()
+
+        if row_caja is None:
+            raise RuntimeError("No hay cajas definidas en la tabla 'cajas'.")
+        return row_caja
+
+    def _resolve_checkout_context(
+        self, cur: sqlite3.Cursor, caja_numero: int | None
+    ) -> CheckoutContext:
+        """Busca usuario, caja y apertura abierta (o abre una). Va dentro de una transacción."""
+        # Usuario (primer usuario activo)
+        cur.execute(
+            "SELECT id FROM usuarios WHERE activo = 1 ORDER BY id LIMIT 1"
+        )
+        row_user = cur.fetchone()
+        if row_user is None:
+            raise RuntimeError("No hay usuarios activos en la tabla 'usuarios'.")
+        usuario_id = row_user["id"]
+
+        caja = self._resolve_caja(caja_numero)
+        caja_id = caja["id"]
+
+        # Apertura de caja abierta para esa caja (o crear una)
+        cur.execute(
+            """
+            SELECT id FROM aperturas_caja
+            WHERE caja_id = ? AND estado = 'abierta'
+            ORDER BY fecha_apertura DESC
+            LIMIT 1
+            """,
+            (caja_id,),
+        )
+        row_ap = cur.fetchone()
+        if row_ap is None:
+            cur.execute(
+                """
+                INSERT INTO aperturas_caja (caja_id, usuario_id, monto_inicial, estado)
+                VALUES (?,?,0,'abierta')
+                """,
+                (caja_id, usuario_id),
+            )
+            apertura_id = cur.lastrowid
+        else:
+            apertura_id = row_ap["id"]
+
+        return CheckoutContext(usuario_id, caja_id, caja["numero"], apertura_id)
+
+    def checkout_context(self, caja_numero: int | None) -> CheckoutContext:
+        """
+        Contexto de checkout de la caja, resuelto una vez y reutilizado en cada
+        venta. process_qr_token lo resuelve al asignar la caja; si la apertura
+        se cierra (insert en cierres_caja) create_sale_from_cart lo detecta y
+        lo vuelve a resolver.
+        """
+        with self._checkout_lock:
+            context = self._checkout_contexts.get(caja_numero)
+        if context is not None:
+            return context
+        with self._transaction() as conn:
+            context = self._resolve_checkout_context(conn.cursor(), caja_numero)
+        with self._checkout_lock:
+            self._checkout_contexts[caja_numero] = context
+        return context
+
+    def invalidate_checkout_context(self, caja_numero: int | None = None):
+        """Descarta el contexto de esa caja (o de todas)."""
+        with self._checkout_lock:
+            if caja_numero is None:
+                self._checkout_contexts.clear()
+            else:
+                self._checkout_contexts.pop(caja_numero, None)
+
+    @staticmethod
+    def _insert_sale(
+        cur: sqlite3.Cursor,
+        context: CheckoutContext,
+        numero_ticket: str,
+        subtotal: float,
+    ) -> int | None:
+        """
+        Inserta la venta en 'procesando' solo si la apertura del contexto sigue
+        abierta (el chequeo va en el mismo INSERT). None si ya se cerró.
+        """
+        cur.execute(
+            """
+            INSERT INTO ventas (
+                numero_ticket, caja_id, usuario_id, apertura_id,
+                cliente_nombre, cliente_ruc,
+                subtotal, descuento, iva, total,
+                forma_pago, estado
+            )
+            SELECT ?,?,?,?,NULL,NULL, ?,0,0,?,'efectivo',?
+            WHERE EXISTS (
+                SELECT 1 FROM aperturas_caja WHERE id = ? AND estado = 'abierta'
+            )
+            """,
+            (
+                numero_ticket,
+                context.caja_id,
+                context.usuario_id,
+                context.apertura_id,
+                subtotal,
+                subtotal,
+                inventory.STAGING_STATE,
+                context.apertura_id,
+            ),
+        )
+        return cur.lastrowid if cur.rowcount == 1 else None
+
     def create_sale_from_cart(self, cart_id: int, caja_numero: int | None = None) -> int | None:
         """
-        Toma los ítems del carrito y crea:
+        Toma los ítems del carrito y crea, en una sola transacción:
         - una fila en ventas
-        - varias filas en detalle_ventas
+        - todas las filas de detalle_ventas (un INSERT ... SELECT)
+        - el cierre del carrito
+        El número de ticket lo da TicketAllocator (bloques por caja) recién
+        con el carrito confirmado con líneas, y se devuelve si la venta no se
+        registra: un checkout vacío o fallido no deja huecos en la numeración.
+        Usuario/caja/apertura salen del contexto cacheado (checkout_context).
         Usando tus tablas: usuarios, cajas, aperturas_caja, ventas, detalle_ventas.
         """
-        with self._get_conn() as conn:
+        now = datetime.datetime.now()
+        # Carrito vacío: ni siquiera se pide número de ticket
+        if not self._cart_has_items(cart_id):
+            return None
+        context = self.checkout_context(caja_numero)
+        # Fuera de la transacción: la reserva de un bloque nuevo se confirma sola
+        numero_ticket = self.tickets.next_ticket(context.caja_id, context.caja_numero)
+        try:
+            venta_id, resolved = self._register_sale(
+                cart_id, caja_numero, context, numero_ticket, now
+            )
+        except BaseException:
+            self.tickets.give_back(context.caja_id, numero_ticket)
+            raise
+        if venta_id is None:
+            # Se vació entre el chequeo y la transacción
+            self.tickets.give_back(context.caja_id, numero_ticket)
+            return None
+
+        if resolved is not None:
+            with self._checkout_lock:
+                self._checkout_contexts[caja_numero] = resolved
+        return venta_id
+
+    def _cart_has_items(self, cart_id: int) -> bool:
+        row = self._get_conn().execute(
+            "SELECT EXISTS (SELECT 1 FROM cart_items WHERE cart_id = ?)", (cart_id,)
+        ).fetchone()
+        return bool(row[0])
+
+    def _register_sale(
+        self,
+        cart_id: int,
+        caja_numero: int | None,
+        context: CheckoutContext,
+        numero_ticket: str,
+        now: datetime.datetime,
+    ) -> tuple[int | None, CheckoutContext | None]:
+        """
+        Transacción del checkout. Devuelve (venta_id, contexto re-resuelto si
+        la apertura cacheada ya estaba cerrada); venta_id None si el carrito
+        está vacío.
+        """
+        resolved = None
+        with self._transaction() as conn:
             cur = conn.cursor()
 
-            items = self.get_cart_items(cart_id)
-            if not items:
-                return None
-
-            # Total del carrito
-            subtotal = 0
-            for it in items:
-                subtotal += float(it["quantity"]) * float(it["unit_price"])
-
-            # Usuario (primer usuario activo)
+            # Total del carrito (una sola vez, no por fila)
             cur.execute(
-                "SELECT id FROM usuarios WHERE activo = 1 ORDER BY id LIMIT 1"
+                """
+                SELECT COUNT(*) AS lineas,
+                       COALESCE(SUM(quantity * unit_price), 0) AS subtotal
+                FROM cart_items
+                WHERE cart_id = ?
+                """,
+                (cart_id,),
             )
-            row_user = cur.fetchone()
-            if row_user is None:
-                raise RuntimeError("No hay usuarios activos en la tabla 'usuarios'.")
-            usuario_id = row_user["id"]
-
-            # Caja: intentamos usar el número escaneado
-            row_caja = None
-            if caja_numero is not None:
-                cur.execute(
-                    "SELECT id FROM cajas WHERE numero = ? ORDER BY id LIMIT 1",
-                    (caja_numero,),
-                )
-                row_caja = cur.fetchone()
+            totals = cur.fetchone()
+            if totals["lineas"] == 0:
+                return None, None
+            subtotal = totals["subtotal"]
 
-            if row_caja is None:
-                cur.execute("SELECT id FROM cajas ORDER BY id LIMIT 1")
-                row_caja = cur.fetchone()
-
-            if row_caja is None:
-                raise RuntimeError("No hay cajas definidas en la tabla 'cajas'.")
-
-            caja_id = row_caja["id"]
+            # Venta en 'procesando': los triggers por fila de detalle no se disparan
+            venta_id = self._insert_sale(cur, context, numero_ticket, subtotal)
+            if venta_id is None:
+                # Se cerró la apertura desde que se armó el contexto: resolver de nuevo
+                resolved = self._resolve_checkout_context(cur, caja_numero)
+                venta_id = self._insert_sale(cur, resolved, numero_ticket, subtotal)
 
-            # Apertura de caja abierta para esa caja (o crear una)
+            # Todo el detalle de una vez
             cur.execute(
                 """
-                SELECT id FROM aperturas_caja
-                WHERE caja_id = ? AND estado = 'abierta'
-                ORDER BY fecha_apertura DESC
-                LIMIT 1
+                INSERT INTO detalle_ventas (
+                    venta_id, producto_id, cantidad, precio_unitario, subtotal
+                )
+                SELECT ?, product_id, quantity, unit_price, quantity * unit_price
+                FROM cart_items
+                WHERE cart_id = ?
+                ORDER BY id
                 """,
-                (caja_id,),
+                (venta_id, cart_id),
             )
-            row_ap = cur.fetchone()
-            if row_ap is None:
-                cur.execute(
-                    """
-                    INSERT INTO aperturas_caja (caja_id, usuario_id, monto_inicial, estado)
-                    VALUES (?,?,0,'abierta')
-                    """,
-                    (caja_id, usuario_id),
-                )
-                apertura_id = cur.lastrowid
-            else:
-                apertura_id = row_ap["id"]
 
-            # Generar número de ticket
-            numero_ticket = datetime.datetime.now().strftime("M%Y%m%d%H%M%S")
+            # Stock y movimientos de todas las líneas en bloque
+            inventory.post_sale(cur, venta_id)
 
-            # Insertar venta
             cur.execute(
                 """
-                INSERT INTO ventas (
-                    numero_ticket, caja_id, usuario_id, apertura_id,
-                    cliente_nombre, cliente_ruc,
-                    subtotal, descuento, iva, total,
-                    forma_pago, estado
-                )
-                VALUES (?,?,?,?,NULL,NULL, ?,0,0,?,'efectivo','completada')
+                UPDATE ventas
+                SET subtotal = ?, total = ? - descuento, estado = 'completada'
+                WHERE id = ?
                 """,
-                (
-                    numero_ticket,
-                    caja_id,
-                    usuario_id,
-                    apertura_id,
-                    subtotal,
-                    subtotal,
-                ),
+                (subtotal, subtotal, venta_id),
             )
-            venta_id = cur.lastrowid
+            # Totales del día / producto para los tableros, en el mismo commit
+            sales_summary.record_sale(cur, venta_id)
 
-            # Insertar detalle_ventas (disparará triggers de stock y totales)
-            for it in items:
-                cantidad = float(it["quantity"])
-                precio = float(it["unit_price"])
-                sub = cantidad * precio
-                cur.execute(
-                    """
-                    INSERT INTO detalle_ventas (
-                        venta_id, producto_id, cantidad, precio_unitario, subtotal
-                    ) VALUES (?,?,?,?,?)
-                    """,
-                    (
-                        venta_id,
-                        it["product_id"],
-                        cantidad,
-                        precio,
-                        sub,
-                    ),
-                )
-
-            conn.commit()
-            return venta_id
+            # Cerrar el carrito en el mismo commit que la venta
+            cur.execute(
+                """
+                UPDATE carts
+                SET status = 'closed', closed_at = ?
+                WHERE id = ?
+                """,
+                (now.isoformat(sep=" ", timespec="seconds"), cart_id),
+            )
+        return venta_id, resolved
 
 
 # ================== ESTADO GLOBAL SENCILLO ==================
 
 
 class AppState:
-    def __init__(self, db: Database):
+    """Estado de una sesión: liviano, lo pesado está en SharedServices."""
+
+    def __init__(self, db: AsyncDatabase):
         self.db = db
         self.cash_register = None  # Row de la caja (cash_registers)
         self.cart_id: int | None = None
@@ -423,10 +941,91 @@ class AppState:
         self.barcode_scanning = False   # escáner de barras
 
 
+# ================== SERVICIOS COMPARTIDOS ENTRE SESIONES ==================
+
+# Páginas del listado en caché y hilos para el buscador (compartidos)
+LISTING_CACHE_SIZE = 256
+SEARCH_WORKERS = 4
+
+
+class SharedServices(NamedTuple):
+    """Lo que comparten todas las sesiones (teléfonos / kioscos) del proceso."""
+    db: Database
+    adb: AsyncDatabase
+    search_executor: ThreadPoolExecutor
+    # Recalcula los resúmenes diarios de ventas (ventas de otros módulos)
+    rollup_job: sales_summary.RollupJob
+    # Latencia tecla -> resultado del buscador de productos (para ajustar el debounce)
+    search_latency: LatencyHistogram
+
+
+_services: asyncio.Future | None = None
+
+
+async def _start_services() -> SharedServices:
+    db = Database(listing_cache_size=LISTING_CACHE_SIZE)
+    adb = AsyncDatabase(db, max_workers=configured_db_workers())
+    await adb.init_schema_and_seed()
+    search_executor = ThreadPoolExecutor(
+        max_workers=SEARCH_WORKERS, thread_name_prefix="product-search"
+    )
+    rollup_job = sales_summary.RollupJob(db)
+    rollup_job.start()
+    services = SharedServices(
+        db,
+        adb,
+        search_executor,
+        rollup_job,
+        METRICS.histogram("search_latency_ms"),
+    )
+    METRICS.register_collector(lambda: _service_samples(services))
+    metrics.start_from_env()
+    return services
+
+
+def _service_samples(services: SharedServices):
+    """Contadores que ya llevan los servicios, para el export de métricas."""
+    db = services.db
+    for key, value in db.product_index.stats().items():
+        yield f"product_index_{key}", value, {}
+    if db.listing_cache is not None:
+        for key, value in db.listing_cache.stats().items():
+            yield f"listing_cache_{key}", value, {}
+    yield "tickets_issued", db.tickets.issued, {}
+    yield "tickets_block_reservations", db.tickets.reservations, {}
+    yield "db_executor_pending", services.adb.pending, {}
+    yield "sales_rollup_runs", services.rollup_job.runs, {}
+    yield "sales_rollup_errors", services.rollup_job.errors, {}
+
+
+async def shared_services() -> SharedServices:
+    """
+    Servicios del proceso. La primera sesión crea la BD, corre el esquema y
+    el seed y arranca los hilos compartidos; las demás (también las que
+    llegan mientras tanto) esperan y reciben los mismos. Si falla, la
+    próxima sesión lo vuelve a intentar.
+    """
+    global _services
+    if _services is None:
+        _services = asyncio.ensure_future(_start_services())
+    future = _services
+    try:
+        # shield: si se cae la sesión que arrancó, el resto sigue esperando
+        return await asyncio.shield(future)
+    except Exception:
+        if _services is future and future.done():
+            _services = None
+        raise
+
+
 # ================== UI EN FLET ==================
 
+# Listado de productos: alto fijo por fila y filas visibles en el diálogo de 400px
+PRODUCT_TILE_EXTENT = 80
+PRODUCT_VISIBLE_ROWS = 6
+
 
-def main(page: ft.Page):
+async def main(page: ft.Page):
     page.title = "Mobile Cart - Supermarket"
     page.vertical_alignment = ft.MainAxisAlignment.START
     page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
@@ -434,9 +1033,20 @@ def main(page: ft.Page):
     page.window_width = 390
     page.window_height = 844
 
-    db = Database()
-    db.init_schema_and_seed()
-    state = AppState(db)
+    # BD, catálogo y carritos son del proceso; la sesión solo guarda su estado.
+    # Todo lo que toca la BD pasa por la fachada async (executor acotado):
+    # los handlers son corrutinas y el loop nunca espera a SQLite
+    services = await shared_services()
+    db, adb = services.db, services.adb
+    state = AppState(adb)
+
+    update_ms = METRICS.histogram("ui_update_ms", FAST_BUCKETS_MS)
+
+    def update_page():
+        # page.update() arma el diff y lo manda al cliente: se mide siempre
+        start = time.perf_counter()
+        page.update()
+        update_ms.observe((time.perf_counter() - start) * 1000)
 
     status_text = ft.Text("", color=ft.Colors.RED)
 
@@ -460,6 +1070,99 @@ def main(page: ft.Page):
         visible=False,
     )
 
+    # ----------- ESCÁNER CON CÁMARA (compartido QR / barras) -----------
+
+    # La cámara queda abierta toda la sesión; una sola tarea decodifica según el
+    # modo (el decode corre en el executor y los controles se tocan en el loop).
+    # Con SCAN_SOURCE se escanean frames grabados (directorio o video) en loop.
+    camera = CameraService(configured_source(), fps=30, loop=True)
+    scanner = ScanWorker(camera)
+
+    def set_scanning(mode: str, value: bool):
+        if mode == "qr":
+            state.qr_scanning = value
+        else:
+            state.barcode_scanning = value
+
+    def make_decoder(mode: str) -> FrameDecoder | PooledDecoder:
+        # Con SCAN_DECODE_WORKERS > 0 se decodifica en el pool de procesos
+        pool = get_decode_pool()
+        if pool is not None:
+            return pool.decoder(mode)
+        return qr_decoder() if mode == "qr" else product_decoder()
+
+    async def start_scan(
+        mode: str,
+        decoder: FrameDecoder | PooledDecoder,
+        preview: ft.Image,
+        on_detected,
+        label: str = "",
+        continuous: bool = False,
+        on_stopped=None,
+    ):
+        """
+        Escanea con la cámara compartida mostrando el preview en `preview`.
+        Las lecturas se confirman por tiempo con ScanConfirmer y se pasan a
+        la corrutina on_detected(código):
+        - modo único: con la primera lectura confirmada se cierra el escáner
+        - modo continuo: el escáner sigue abierto hasta stop()
+        """
+        confirmer = ScanConfirmer()
+        last = {"detected": None}
+
+        def publish_preview(img_b64: str):
+            try:
+                preview.src_base64 = img_b64
+                preview.update()
+            except Exception as ex:
+                status_text.value = f"Error mostrando cámara{label}: {ex}"
+                update_page()
+
+        # El preview es su propia tarea, achicado al tamaño en pantalla:
+        # un cliente lento no frena la decodificación
+        preview_encoder = PreviewEncoder(
+            camera, publish_preview, (preview.width, preview.height)
+        )
+
+        async def handle_codes(codes: list[str]) -> bool:
+            for data in confirmer.feed(codes):
+                if continuous:
+                    await on_detected(data)
+                else:
+                    last["detected"] = data
+                    return True
+            return False
+
+        def on_stop(error: str | None):
+            preview_encoder.stop()
+            decoder.close()
+            if scanner.mode == mode:
+                # Ya arrancó otro escaneo del mismo modo: el preview es suyo
+                return
+            set_scanning(mode, False)
+            preview.visible = False
+            preview.update()
+            if error:
+                status_text.value = f"{error}{label}"
+                update_page()
+            if on_stopped is not None:
+                on_stopped()
+            if last["detected"] is not None:
+                page.run_task(on_detected, last["detected"])
+
+        set_scanning(mode, True)
+        preview.visible = True
+        preview.update()
+        if await scanner.start(mode, decoder.decode, handle_codes, on_stop):
+            preview_encoder.start()
+
+    async def on_disconnect(e):
+        scanner.stop()
+        # close() espera al hilo de captura: fuera del loop
+        await adb.run(camera.close)
+
+    page.on_disconnect = on_disconnect
+
     # ----------- PANTALLA 1: SELECCIÓN DE CAJA POR QR -----------
 
     qr_input = ft.TextField(
@@ -468,103 +1171,49 @@ def main(page: ft.Page):
         expand=True,
     )
 
-    def on_qr_detected(token: str):
+    async def on_qr_detected(token: str):
         qr_input.value = token
         status_text.value = f"QR detectado: {token}"
-        page.update()
-        process_qr_token(token)
-
-    def qr_scan_thread():
-        state.qr_scanning = True
-        cap = cv2.VideoCapture(0)
-        last_data = None
-        stable_count = 0
-
-        if not cap.isOpened():
-            status_text.value = "No se pudo abrir la cámara."
-            page.update()
-            state.qr_scanning = False
-            camera_image.visible = False
-            camera_image.update()
-            return
-
-        while state.qr_scanning:
-            ret, frame = cap.read()
-            if not ret:
-                status_text.value = "No se pudo leer la cámara."
-                page.update()
-                break
+        update_page()
+        await process_qr_token(token)
 
-            # Mostrar preview
-            try:
-                ok, buffer = cv2.imencode(".jpg", frame)
-                if ok:
-                    img_b64 = base64.b64encode(buffer).decode("utf-8")
-                    camera_image.src_base64 = img_b64
-                    camera_image.update()
-            except Exception as ex:
-                status_text.value = f"Error mostrando cámara: {ex}"
-                page.update()
-
-            # Leer QR
-            codes = decode(frame)
-            if codes:
-                data = codes[0].data.decode("utf-8")
-                if data == last_data:
-                    stable_count += 1
-                else:
-                    last_data = data
-                    stable_count = 1
-
-                if stable_count >= 5:
-                    state.qr_scanning = False
-                    cap.release()
-                    cv2.destroyAllWindows()
-                    camera_image.visible = False
-                    camera_image.update()
-                    on_qr_detected(data)
-                    return
-
-            cv2.waitKey(1)
-            time.sleep(0.03)
-
-        cap.release()
-        cv2.destroyAllWindows()
-        state.qr_scanning = False
-        camera_image.visible = False
-        camera_image.update()
-
-    def start_qr_scan(e):
+    async def start_qr_scan(e):
         if state.qr_scanning:
             status_text.value = "Ya se está escaneando el QR..."
-            page.update()
+            update_page()
             return
         status_text.value = "Apunta la cámara al código QR de la caja..."
-        camera_image.visible = True
-        camera_image.update()
-        page.update()
-        threading.Thread(target=qr_scan_thread, daemon=True).start()
+        update_page()
+        await start_scan("qr", make_decoder("qr"), camera_image, on_qr_detected)
 
-    def process_qr_token(token: str):
+    async def process_qr_token(token: str):
         token = token.strip()
         if not token:
             status_text.value = "Ingresa o escanea un QR válido."
-            page.update()
+            update_page()
             return
 
-        caja = db.get_cash_register_by_qr(token)
+        caja = await adb.get_cash_register_by_qr(token)
         if caja is None:
             status_text.value = "No se encontró una caja activa para ese QR."
-            page.update()
+            update_page()
+            return
+
+        try:
+            # Usuario/caja/apertura de las ventas: se resuelven una vez acá
+            await adb.checkout_context(caja["numero"])
+        except (RuntimeError, sqlite3.Error) as ex:
+            status_text.value = f"No se pudo preparar la caja: {ex}"
+            update_page()
             return
 
         state.cash_register = caja
-        state.cart_id = db.create_cart(caja["id"])
+        state.cart_id = await adb.create_cart(caja["id"])
         status_text.value = ""
-        show_cart_view()
+        await show_cart_view()
 
-    def on_qr_continue(e):
-        process_qr_token(qr_input.value)
+    async def on_qr_continue(e):
+        await process_qr_token(qr_input.value)
 
     qr_scan_button = ft.ElevatedButton(
         text="Escanear QR con cámara",
@@ -608,7 +1257,6 @@ def main(page: ft.Page):
         expand=True,
     )
 
-    cart_rows: list[ft.DataRow] = []
     cart_table = ft.DataTable(
         columns=[
             ft.DataColumn(ft.Text("Producto")),
@@ -617,7 +1265,7 @@ def main(page: ft.Page):
             ft.DataColumn(ft.Text("Subtotal")),
             ft.DataColumn(ft.Text("Acciones")),
         ],
-        rows=cart_rows,
+        rows=[],
         column_spacing=10,
         heading_row_height=32,
         data_row_min_height=32,
@@ -629,149 +1277,125 @@ def main(page: ft.Page):
         weight=ft.FontWeight.BOLD,
     )
 
-    def on_delete_cart_item(cart_item_id: int):
+    async def delete_cart_item(cart_item_id: int):
         if state.cart_id is None:
             return
-        db.remove_cart_item(cart_item_id)
-        refresh_cart_table()
+        await adb.remove_cart_item(cart_item_id)
+        cart_model.remove_line(cart_item_id)
+        update_page()
 
-    def refresh_cart_table():
-        if state.cart_id is None:
-            return
-        items = db.get_cart_items(state.cart_id)
-        cart_table.rows.clear()
-        total = 0.0
-        for it in items:
-            subtotal = float(it["quantity"]) * float(it["unit_price"])
-            total += subtotal
-            cart_item_id = it["id"]
-            cart_table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(it["name"])),
-                        ft.DataCell(ft.Text(str(it["quantity"]))),
-                        ft.DataCell(ft.Text(f"{it['unit_price']:,.2f}")),
-                        ft.DataCell(ft.Text(f"{subtotal:,.2f}")),
-                        ft.DataCell(
-                            ft.IconButton(
-                                icon=ft.Icons.DELETE,
-                                tooltip="Eliminar",
-                                on_click=lambda e, cid=cart_item_id: on_delete_cart_item(
-                                    cid
-                                ),
-                            )
-                        ),
-                    ]
-                )
-            )
-        total_text.value = f"Total: {total:,.2f} Gs."
-        page.update()
+    def on_delete_cart_item(cart_item_id: int):
+        # El botón de la fila llama desde un hilo de Flet: se pasa al loop
+        page.run_task(delete_cart_item, cart_item_id)
 
-    def add_product_to_cart(product_row, qty: int = 1):
+    cart_model = CartTableModel(cart_table, total_text, on_delete_cart_item)
+
+    async def refresh_cart_table():
+        """Re-sincroniza la tabla completa desde la BD (solo a pedido)."""
+        with METRICS.timer("cart_refresh_ms", FAST_BUCKETS_MS):
+            if state.cart_id is None:
+                cart_model.clear()
+            else:
+                cart_model.sync(await adb.get_cart_items(state.cart_id))
+            update_page()
+
+    async def add_product_to_cart(product_row, qty: int = 1):
         if state.cart_id is None:
             status_text.value = "No hay un carrito activo."
-            page.update()
+            update_page()
             return
-        db.add_item_to_cart(
+        line = await adb.add_item_to_cart(
             state.cart_id,
             product_row["id"],
             qty,
             float(product_row["price"]),
         )
+        if line is None:
+            # El carrito ya se cobró (escaneo que llegó tarde)
+            status_text.value = "La compra ya se finalizó: no se agregó el producto."
+            update_page()
+            return
+        cart_model.apply_line(
+            line["id"],
+            product_row["name"],
+            int(line["quantity"]),
+            float(line["unit_price"]),
+        )
         status_text.value = f"Se agregó {product_row['name']} x{qty}."
-        refresh_cart_table()
+        update_page()
+
+    async def add_by_barcode(code: str) -> bool:
+        """Busca el producto por código y lo agrega; devuelve True si se agregó."""
+        # Lectura -> producto en la tabla del carrito (BD y UI)
+        with METRICS.timer("scan_to_cart_ms", FAST_BUCKETS_MS):
+            return await _add_by_barcode(code)
+
+    async def _add_by_barcode(code: str) -> bool:
+        try:
+            normalize_barcode(code, validate_check_digit=False)
+        except InvalidBarcode as ex:
+            status_text.value = str(ex)
+            update_page()
+            return False
+        prod = await adb.get_product_by_barcode(code)
+        if prod is None:
+            status_text.value = f"Producto no encontrado para el código {code}."
+            update_page()
+            return False
+        await add_product_to_cart(prod, qty=1)
+        return True
 
-    def on_add_by_barcode(e):
+    async def on_add_by_barcode(e):
         code = barcode_input.value.strip()
         if not code:
             status_text.value = "Ingresa un código de barras."
-            page.update()
-            return
-        prod = db.get_product_by_barcode(code)
-        if prod is None:
-            status_text.value = f"Producto no encontrado para el código {code}."
-            page.update()
+            update_page()
             return
-        add_product_to_cart(prod, qty=1)
-        barcode_input.value = ""
-        page.update()
+        if await add_by_barcode(code):
+            barcode_input.value = ""
+            update_page()
 
     # --- escáner de código de barras con cámara ---
 
-    def on_barcode_detected(code: str):
-        barcode_input.value = code
-        page.update()
-        on_add_by_barcode(None)
-
-    def barcode_scan_thread():
-        state.barcode_scanning = True
-        cap = cv2.VideoCapture(0)
-        last_data = None
-        stable_count = 0
-
-        if not cap.isOpened():
-            status_text.value = "No se pudo abrir la cámara para barras."
-            page.update()
-            state.barcode_scanning = False
-            barcode_camera_image.visible = False
-            barcode_camera_image.update()
-            return
+    continuous_scan_switch = ft.Switch(label="Escaneo continuo", value=True)
 
-        while state.barcode_scanning:
-            ret, frame = cap.read()
-            if not ret:
-                status_text.value = "No se pudo leer la cámara (barras)."
-                page.update()
-                break
+    async def on_barcode_detected(code: str):
+        # Cada código confirmado se agrega directo (en continuo no se frena la cámara)
+        await add_by_barcode(code)
 
-            # preview
-            try:
-                ok, buffer = cv2.imencode(".jpg", frame)
-                if ok:
-                    img_b64 = base64.b64encode(buffer).decode("utf-8")
-                    barcode_camera_image.src_base64 = img_b64
-                    barcode_camera_image.update()
-            except Exception as ex:
-                status_text.value = f"Error mostrando cámara (barras): {ex}"
-                page.update()
-
-            codes = decode(frame)
-            if codes:
-                data = codes[0].data.decode("utf-8")
-                if data == last_data:
-                    stable_count += 1
-                else:
-                    last_data = data
-                    stable_count = 1
-
-                if stable_count >= 5:
-                    state.barcode_scanning = False
-                    cap.release()
-                    cv2.destroyAllWindows()
-                    barcode_camera_image.visible = False
-                    barcode_camera_image.update()
-                    on_barcode_detected(data)
-                    return
-
-            cv2.waitKey(1)
-            time.sleep(0.03)
-
-        cap.release()
-        cv2.destroyAllWindows()
-        state.barcode_scanning = False
-        barcode_camera_image.visible = False
-        barcode_camera_image.update()
+    def on_barcode_scan_stopped():
+        scan_barcode_button.text = "Escanear con cámara"
+        scan_barcode_button.icon = ft.Icons.QR_CODE_SCANNER
+        update_page()
 
-    def start_barcode_scan(e):
+    async def start_barcode_scan(e):
         if state.barcode_scanning:
+            if scanner.mode == "barcode":
+                # El botón hace de "Detener" mientras la cámara está abierta
+                scanner.stop()
+                status_text.value = "Escáner detenido."
+                update_page()
+                return
             status_text.value = "Ya se está escaneando el código de barras..."
-            page.update()
+            update_page()
             return
-        status_text.value = "Apunta la cámara al código de barras del producto..."
-        barcode_camera_image.visible = True
-        barcode_camera_image.update()
-        page.update()
-        threading.Thread(target=barcode_scan_thread, daemon=True).start()
+        continuous = bool(continuous_scan_switch.value)
+        if continuous:
+            status_text.value = "Pasá los productos por la cámara, se agregan solos..."
+            scan_barcode_button.text = "Detener cámara"
+            scan_barcode_button.icon = ft.Icons.STOP
+        else:
+            status_text.value = "Apunta la cámara al código de barras del producto..."
+        update_page()
+        await start_scan(
+            "barcode",
+            make_decoder("barcode"),
+            barcode_camera_image,
+            on_barcode_detected,
+            " (barras)",
+            continuous=continuous,
+            on_stopped=on_barcode_scan_stopped,
+        )
 
     add_barcode_button = ft.FilledButton(
         text="Agregar por código de barras",
@@ -787,54 +1411,167 @@ def main(page: ft.Page):
 
     # ---- listado de productos desde BD (tabla productos) ----
 
-    def open_product_list_dialog(e):
+    async def open_product_list_dialog(e):
         search_field = ft.TextField(
             label="Buscar producto",
             autofocus=True,
-            on_change=lambda ev: update_product_list(ev.control.value),
+            on_change=lambda ev: search.submit(ev.control.value),
         )
 
-        product_list_column = ft.Column(
-            spacing=5,
-            scroll=ft.ScrollMode.AUTO,
+        # ListView con alto fijo por fila: Flutter solo construye las filas
+        # visibles y podemos calcular cuáles están en pantalla desde el scroll
+        product_list_view = ft.ListView(
+            spacing=0,
+            item_extent=PRODUCT_TILE_EXTENT,
             expand=True,
+            on_scroll_interval=100,
         )
-
-        def update_product_list(search_text: str = ""):
-            product_list_column.controls.clear()
-            products = db.list_products(search_text)
-            if not products:
-                product_list_column.controls.append(
-                    ft.Text("No se encontraron productos.", italic=True)
-                )
-            else:
-                for p in products:
-                    tile = ft.ListTile(
+        empty_text = ft.Text("No se encontraron productos.", italic=True)
+
+        # Estado del listado (solo se toca en el loop de la sesión)
+        listing = {
+            "text": "",
+            "rows": [],
+            "exhausted": False,
+            "loading": False,
+            "first_visible": 0,
+            "visible_count": PRODUCT_VISIBLE_ROWS,
+        }
+        tile_pool: list[ft.ListTile] = []
+
+        async def on_tile_add(ev):
+            prod = ev.control.data
+            if prod is None:
+                return
+            await add_product_to_cart(prod, qty=1)
+            await close_dialog()
+
+        def get_tile(idx: int) -> ft.ListTile:
+            # Reutilizamos los tiles entre búsquedas: al cliente solo viajan los cambios
+            while len(tile_pool) <= idx:
+                tile_pool.append(
+                    ft.ListTile(
                         leading=ft.Image(
-                            src=p["image_url"] or "",
                             width=40,
                             height=40,
                             fit=ft.ImageFit.COVER,
+                            visible=False,
                         ),
-                        title=ft.Text(p["name"]),
-                        subtitle=ft.Text(
-                            f"{p['description'] or ''}\nCod: {p['barcode']} - {p['price']:,.2f} Gs."
-                        ),
-                        trailing=ft.IconButton(
-                            icon=ft.Icons.ADD,
-                            on_click=lambda ev, prod=p: (
-                                add_product_to_cart(prod, qty=1),
-                                close_dialog()
-                            ),
-                        ),
+                        title=ft.Text(),
+                        subtitle=ft.Text(),
+                        trailing=ft.IconButton(icon=ft.Icons.ADD, on_click=on_tile_add),
                     )
-                    product_list_column.controls.append(tile)
+                )
+            return tile_pool[idx]
 
-            page.update()
+        def bind_tile(tile: ft.ListTile, p, show_image: bool):
+            tile.title.value = p["name"]
+            tile.subtitle.value = (
+                f"{p['description'] or ''}\nCod: {p['barcode']} - {p['price']:,.2f} Gs."
+            )
+            tile.trailing.data = p
+            bind_image(tile, p, show_image)
+
+        def bind_image(tile: ft.ListTile, p, show_image: bool):
+            # Imagen diferida: solo se pide la URL de las filas en pantalla
+            url = p["image_url"]
+            if not url:
+                tile.leading.visible = False
+            elif show_image:
+                tile.leading.src = url
+                tile.leading.visible = True
+            elif tile.leading.src != url:
+                # Tile reutilizado fuera de pantalla: se oculta la imagen anterior
+                tile.leading.visible = False
+
+        def is_visible(idx: int) -> bool:
+            first = listing["first_visible"]
+            return first <= idx < first + listing["visible_count"]
+
+        def render(start: int):
+            rows = listing["rows"]
+            if not rows:
+                product_list_view.controls = [empty_text]
+                return
+            controls = product_list_view.controls
+            if start == 0:
+                controls = []
+            for idx in range(start, len(rows)):
+                tile = get_tile(idx)
+                bind_tile(tile, rows[idx], is_visible(idx))
+                controls.append(tile)
+            product_list_view.controls = controls
+
+        async def update_product_list(search_text: str, products, offset: int):
+            # Solo con resultados de la búsqueda vigente (ver on_search_result)
+            had_rows = bool(listing["rows"])
+            if offset == 0:
+                listing["text"] = search_text
+                listing["rows"] = list(products)
+                listing["first_visible"] = 0
+            elif search_text == listing["text"] and offset == len(listing["rows"]):
+                listing["rows"].extend(products)
+            else:
+                return
+            listing["exhausted"] = len(products) < PRODUCT_PAGE_SIZE
+            listing["loading"] = False
+            render(offset)
+            if offset == 0 and had_rows:
+                product_list_view.scroll_to(offset=0)
+            update_page()
+
+        def on_search_result(search_text: str, products, offset: int):
+            # Llega desde el hilo del buscador: los controles se tocan en el loop
+            page.run_task(update_product_list, search_text, products, offset)
+
+        async def show_search_error(search_text: str, error: Exception, offset: int):
+            # Sin esto una página siguiente fallida dejaba "loading" trabado
+            listing["loading"] = False
+            status_text.value = f"Error al buscar productos: {error}"
+            update_page()
+
+        def on_search_error(search_text: str, error: Exception, offset: int):
+            page.run_task(show_search_error, search_text, error, offset)
+
+        async def on_list_scroll(ev):
+            if ev.viewport_dimension:
+                listing["visible_count"] = (
+                    int(ev.viewport_dimension // PRODUCT_TILE_EXTENT) + 2
+                )
+            first = max(0, int(ev.pixels // PRODUCT_TILE_EXTENT) - 1)
+            changed = first != listing["first_visible"]
+            listing["first_visible"] = first
+
+            # Cerca del final: pedir la página siguiente
+            near_end = ev.max_scroll_extent - ev.pixels < PRODUCT_TILE_EXTENT * 5
+            if near_end and not listing["exhausted"] and not listing["loading"]:
+                listing["loading"] = True
+                search.load_more(listing["text"], len(listing["rows"]))
+
+            if changed:
+                rows = listing["rows"]
+                last = min(len(rows), first + listing["visible_count"])
+                for idx in range(first, last):
+                    bind_image(tile_pool[idx], rows[idx], True)
+                update_page()
+
+        product_list_view.on_scroll = on_list_scroll
+
+        # Hilos del buscador compartidos: SearchPipeline solo interrumpe un
+        # hilo mientras sigue en una consulta de este diálogo
+        search = SearchPipeline(
+            db.list_products,
+            on_search_result,
+            executor=services.search_executor,
+            interrupt_fn=db.interrupt,
+            latency=services.search_latency,
+            on_error=on_search_error,
+        )
 
-        def close_dialog(*_):
+        async def close_dialog(*_):
+            search.close()
             page.dialog.open = False
-            page.update()
+            update_page()
 
         dlg = ft.AlertDialog(
             modal=True,
@@ -844,7 +1581,7 @@ def main(page: ft.Page):
                     [
                         search_field,
                         ft.Divider(),
-                        product_list_column,
+                        product_list_view,
                     ],
                     expand=True,
                 ),
@@ -856,8 +1593,8 @@ def main(page: ft.Page):
 
         page.dialog = dlg
         page.dialog.open = True
-        update_product_list("")
-        page.update()
+        search.submit("", immediate=True)
+        update_page()
 
     add_from_list_button = ft.OutlinedButton(
         text="Agregar desde listado",
@@ -865,31 +1602,34 @@ def main(page: ft.Page):
         on_click=open_product_list_dialog,
     )
 
-    def on_finish_cart(e):
+    async def on_finish_cart(e):
         if state.cart_id is None:
             status_text.value = "No hay carrito para finalizar."
-            page.update()
+            update_page()
             return
 
+        # Sin escaneos durante el cobro (add_item_to_cart igual rechaza los que lleguen tarde)
+        scanner.stop()
         try:
             caja_numero = state.cash_register["numero"] if state.cash_register else None
-            venta_id = db.create_sale_from_cart(state.cart_id, caja_numero=caja_numero)
+            with METRICS.timer("checkout_ms", FAST_BUCKETS_MS):
+                venta_id = await adb.create_sale_from_cart(
+                    state.cart_id, caja_numero=caja_numero
+                )
             if venta_id is None:
                 status_text.value = "El carrito está vacío, no se generó venta."
-                page.update()
+                update_page()
                 return
 
-            # Cerrar carrito
-            db.close_cart(state.cart_id)
-
+            # create_sale_from_cart ya cerró el carrito en la misma transacción
             status_text.value = f"Compra finalizada. Venta registrada (ID: {venta_id})."
             # Limpiamos estado y volvemos a pantalla de QR
             state.cart_id = None
             state.cash_register = None
-            show_qr_view()
+            await show_qr_view()
         except Exception as ex:
             status_text.value = f"Error al registrar la venta: {ex}"
-            page.update()
+            update_page()
 
     finish_button = ft.FilledButton(
         text="Finalizar compra",
@@ -897,7 +1637,8 @@ def main(page: ft.Page):
         on_click=on_finish_cart,
     )
 
-    def show_cart_view():
+    async def show_cart_view():
+        scanner.stop()
         cashier_name = (
             state.cash_register["nombre"] if state.cash_register else "Sin caja"
         )
@@ -920,6 +1661,7 @@ def main(page: ft.Page):
                     [add_barcode_button, scan_barcode_button],
                     alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
                 ),
+                continuous_scan_switch,
                 barcode_camera_image,
                 ft.Row(
                     [add_from_list_button, finish_button],
@@ -948,10 +1690,11 @@ def main(page: ft.Page):
             expand=True,
         )
         page.controls.append(content)
-        refresh_cart_table()
-        page.update()
+        await refresh_cart_table()
+        update_page()
 
-    def show_qr_view():
+    async def show_qr_view():
+        scanner.stop()
         page.controls.clear()
         page.appbar = ft.AppBar(
             title=ft.Text("Seleccionar caja"),
@@ -960,11 +1703,29 @@ def main(page: ft.Page):
         camera_image.visible = False
         barcode_camera_image.visible = False
         page.add(qr_view)
-        page.update()
+        update_page()
 
     # Iniciar en pantalla de QR
-    show_qr_view()
+    await show_qr_view()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Carrito móvil del supermercado")
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        default=os.environ.get("APP_SERVER", "") == "1",
+        help="modo servidor: los teléfonos entran por el navegador (APP_SERVER=1)",
+    )
+    parser.add_argument("--host", default=os.environ.get("APP_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("APP_PORT", "8550")))
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    ft.app(target=main)
\ No newline at end of file
+    args = parse_args()
+    if args.server:
+        # Un proceso para todas las sesiones; sin ventana propia
+        ft.app(target=main, host=args.host, port=args.port, view=None)
+    else:
+        ft.app(target=main)
\ No newline at end of file
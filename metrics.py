@@ -0,0 +1,277 @@
+"""
+Métricas del proceso (histogramas de latencia y contadores) en memoria.
+
+Todo se agrega en el registro METRICS y se exporta en formato de texto de
+Prometheus, por un endpoint HTTP local (METRICS_PORT) o volcando a un
+archivo cada METRICS_DUMP_S segundos (METRICS_FILE), ver start_from_env().
+
+Observar una latencia es un bisect y una suma bajo un lock por histograma:
+se puede dejar prendido con carga.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable
+
+# Buckets para operaciones rápidas (consultas, escaneos desde memoria)
+FAST_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class LatencyHistogram:
+    """Histograma de latencias en ms con buckets fijos (acumulativos al exportar)."""
+
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    def __init__(self, buckets_ms=None):
+        self.buckets_ms = tuple(buckets_ms or self.BUCKETS_MS)
+        # Un casillero extra para lo que supera el último bucket (+Inf)
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float):
+        idx = bisect.bisect_left(self.buckets_ms, ms)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum_ms += ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total_ms = self._sum_ms
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets_ms + (float("inf"),), counts):
+            running += count
+            cumulative[bound] = running
+        return {"count": running, "sum_ms": total_ms, "buckets": cumulative}
+
+
+class Counter:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas por (nombre, etiquetas). Además de histogramas y
+    contadores acepta collectors: funciones que se llaman al exportar y
+    devuelven (nombre, valor, etiquetas) de contadores que ya existen en
+    otros módulos (ProductIndex.stats(), TicketAllocator, ...).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, Labels], LatencyHistogram] = {}
+        self._counters: dict[tuple[str, Labels], Counter] = {}
+        self._collectors: list[Callable[[], Iterable[tuple[str, float, dict]]]] = []
+
+    def histogram(self, name: str, buckets_ms=None, **labels) -> LatencyHistogram:
+        key = (name, _labels(labels))
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, LatencyHistogram(buckets_ms))
+        return hist
+
+    def counter(self, name: str, **labels) -> Counter:
+        key = (name, _labels(labels))
+        counter = self._counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter())
+        return counter
+
+    def observe(self, name: str, ms: float, **labels):
+        self.histogram(name, **labels).observe(ms)
+
+    @contextmanager
+    def timer(self, name: str, buckets_ms=None, **labels):
+        hist = self.histogram(name, buckets_ms, **labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            hist.observe((time.perf_counter() - start) * 1000)
+
+    def register_collector(self, collect: Callable[[], Iterable[tuple[str, float, dict]]]):
+        with self._lock:
+            self._collectors.append(collect)
+
+    # ---- exportación ----
+
+    def render(self) -> str:
+        """Todas las métricas en formato de texto de Prometheus."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            collectors = list(self._collectors)
+
+        lines: list[str] = []
+        typed: set[str] = set()
+
+        def type_line(name: str, kind: str):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), hist in histograms:
+            type_line(name, "histogram")
+            snap = hist.snapshot()
+            for bound, count in snap["buckets"].items():
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{_fmt(labels + (('le', le),))} {count}")
+            lines.append(f"{name}_sum{_fmt(labels)} {snap['sum_ms']:.3f}")
+            lines.append(f"{name}_count{_fmt(labels)} {snap['count']}")
+        for (name, labels), counter in counters:
+            type_line(name, "counter")
+            lines.append(f"{name}{_fmt(labels)} {counter.value}")
+        for collect in collectors:
+            try:
+                samples = list(collect())
+            except Exception:  # noqa: BLE001 - un collector roto no tapa el resto
+                continue
+            for name, value, labels in samples:
+                type_line(name, "gauge")
+                lines.append(f"{name}{_fmt(_labels(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _fmt(labels: Labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = MetricsRegistry()
+
+
+def instrument_methods(metric: str, buckets_ms=FAST_BUCKETS_MS):
+    """
+    Decorador de clase: mide cada método público definido en la clase en
+    el histograma `metric` (etiqueta method=nombre) y cuenta las excepciones
+    en `<metric sin _ms>_errors_total`.
+    """
+    errors_metric = metric.removesuffix("_ms") + "_errors_total"
+
+    def decorate(cls):
+        for name, attr in list(vars(cls).items()):
+            if name.startswith("_") or not callable(attr) or isinstance(attr, (staticmethod, type)):
+                continue
+            setattr(cls, name, _timed_method(attr, metric, errors_metric, buckets_ms))
+        return cls
+
+    return decorate
+
+
+def _timed_method(fn, metric: str, errors_metric: str, buckets_ms):
+    hist = METRICS.histogram(metric, buckets_ms, method=fn.__name__)
+    errors = METRICS.counter(errors_metric, method=fn.__name__)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            hist.observe((time.perf_counter() - start) * 1000)
+
+    return wrapper
+
+
+# ---- exportadores ----
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Sirve GET /metrics en un hilo propio (solo local por defecto)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_file_dump(path: str | Path, interval: float = 15.0) -> threading.Event:
+    """Vuelca las métricas al archivo cada `interval` s; set() en el Event lo frena."""
+    path = Path(path)
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_text(METRICS.render(), encoding="utf-8")
+            # Reemplazo atómico: quien lo lea nunca ve un archivo a medias
+            tmp.replace(path)
+
+    threading.Thread(target=run, name="metrics-dump", daemon=True).start()
+    return stop
+
+
+_started = False
+_started_lock = threading.Lock()
+
+
+def start_from_env():
+    """
+    Arranca los exportadores configurados (una vez por proceso):
+    - METRICS_PORT: endpoint HTTP /metrics en METRICS_HOST (127.0.0.1)
+    - METRICS_FILE: volcado periódico cada METRICS_DUMP_S (15 s)
+    """
+    global _started
+    with _started_lock:
+        if _started:
+            return
+        _started = True
+    port = os.environ.get("METRICS_PORT", "").strip()
+    if port.isdigit():
+        start_http_server(int(port), os.environ.get("METRICS_HOST", "127.0.0.1"))
+    dump_path = os.environ.get("METRICS_FILE", "").strip()
+    if dump_path:
+        try:
+            interval = float(os.environ.get("METRICS_DUMP_S", "15"))
+        except ValueError:
+            interval = 15.0
+        start_file_dump(dump_path, interval)
@@ -0,0 +1,131 @@
+import asyncio
+import base64
+import time
+from concurrent.futures import Executor
+from typing import Callable
+
+import cv2
+
+from camera import CameraService
+from metrics import FAST_BUCKETS_MS, METRICS
+
+
+class PreviewEncoder:
+    """
+    Etapa de preview separada de la decodificación.
+
+    Tarea asyncio de la sesión: toma frames de la cámara compartida en su
+    propia cola (de un lugar, así que se saltea todo lo que llegue mientras
+    el cliente está ocupado), los achica al tamaño en pantalla en el
+    executor y los manda como JPEG base64 con publish(), en el loop.
+    La calidad y los FPS se adaptan a cuánto tarda publish() (el viaje hasta
+    el cliente Flet): si el cliente se atrasa bajamos calidad y después FPS;
+    si sobra margen los volvemos a subir. La decodificación nunca espera al
+    preview.
+    """
+
+    MIN_QUALITY, MAX_QUALITY, QUALITY_STEP = 35, 80, 10
+    MIN_FPS, MAX_FPS = 4.0, 15.0
+    # Suavizado del tiempo de publish() (media móvil exponencial)
+    EWMA_ALPHA = 0.3
+
+    def __init__(
+        self,
+        camera: CameraService,
+        publish: Callable[[str], None],
+        size: tuple[int, int],
+        executor: Executor | None = None,
+    ):
+        self.camera = camera
+        self._executor = executor
+        self._publish = publish
+        self.width, self.height = size
+        self.quality = self.MAX_QUALITY
+        self.fps = self.MAX_FPS
+        self._publish_ms: float | None = None
+        self._task: asyncio.Task | None = None
+
+        self.published = 0
+        self.skipped = 0
+        self._encode_hist = METRICS.histogram("preview_encode_ms", FAST_BUCKETS_MS)
+        self._publish_hist = METRICS.histogram("preview_publish_ms", FAST_BUCKETS_MS)
+
+    def start(self):
+        """Arranca la tarea en el loop que llama."""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(), name="camera-preview")
+
+    def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+
+    # ---- internos ----
+
+    def encode(self, frame) -> str | None:
+        h, w = frame.shape[:2]
+        scale = min(self.width / w, self.height / h, 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(
+                frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA
+            )
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return None
+        return base64.b64encode(buffer).decode("utf-8")
+
+    def _adapt(self, publish_ms: float):
+        if self._publish_ms is None:
+            self._publish_ms = publish_ms
+        else:
+            self._publish_ms += self.EWMA_ALPHA * (publish_ms - self._publish_ms)
+
+        budget_ms = 1000.0 / self.fps
+        if self._publish_ms > budget_ms * 0.8:
+            # Cliente atrasado: primero calidad, después FPS
+            if self.quality > self.MIN_QUALITY:
+                self.quality = max(self.MIN_QUALITY, self.quality - self.QUALITY_STEP)
+            else:
+                self.fps = max(self.MIN_FPS, self.fps * 0.75)
+        elif self._publish_ms < budget_ms * 0.3:
+            if self.fps < self.MAX_FPS:
+                self.fps = min(self.MAX_FPS, self.fps * 1.25)
+            else:
+                self.quality = min(self.MAX_QUALITY, self.quality + self.QUALITY_STEP)
+
+    def _timed_encode(self, frame) -> str | None:
+        start = time.perf_counter()
+        try:
+            return self.encode(frame)
+        finally:
+            self._encode_hist.observe((time.perf_counter() - start) * 1000)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self.camera.subscribe_async(maxsize=1)
+        next_due = 0.0
+        try:
+            while True:
+                frame = await queue.get(timeout=0.5)
+                if frame is None:
+                    if not self.camera.is_open:
+                        break
+                    continue
+                now = time.perf_counter()
+                if now < next_due:
+                    # Todavía no toca otro frame a este FPS
+                    self.skipped += 1
+                    continue
+                b64 = await loop.run_in_executor(self._executor, self._timed_encode, frame)
+                if b64 is None:
+                    continue
+                start = time.perf_counter()
+                self._publish(b64)
+                publish_ms = (time.perf_counter() - start) * 1000
+                self._publish_hist.observe(publish_ms)
+                self.published += 1
+                self._adapt(publish_ms)
+                next_due = start + 1.0 / self.fps
+        finally:
+            self.camera.unsubscribe(queue)
@@ -0,0 +1,260 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+# Mismas columnas/alias que devolvía Database.get_product_by_barcode
+PRODUCT_COLUMNS = """
+    id,
+    descripcion AS name,
+    descripcion AS description,
+    codigo_barr AS barcode,
+    precio_venta AS price,
+    imagen_url AS image_url,
+    activo,
+    updated_at
+"""
+# Lo que muestran el listado y el carrito: solo un cambio acá sube `version`
+# (el posteo de stock de cada venta toca updated_at y no cambia el listado)
+LISTED_COLUMNS = ("name", "description", "barcode", "price", "image_url", "activo")
+
+
+class ProductIndex:
+    """
+    Índice en memoria codigo_barr (int) -> fila de productos.
+
+    Se carga una vez al iniciar y después se refresca de forma incremental:
+    - productos con updated_at >= última marca vista
+    - productos con cambios de precio nuevos en historial_precios
+      (tr_before_update_producto_precio no toca updated_at)
+    El refresco se hace como mucho cada REFRESH_INTERVAL_S, así que la gran
+    mayoría de los escaneos se resuelven sin I/O. `version` sube cada vez
+    que cambia lo que se lista de algún producto (LISTED_COLUMNS, ver
+    ListingCache).
+    """
+
+    REFRESH_INTERVAL_S = 5.0
+
+    def __init__(
+        self,
+        get_conn: Callable[[], sqlite3.Connection],
+        refresh_interval: float | None = None,
+    ):
+        self._get_conn = get_conn
+        self.refresh_interval = (
+            self.REFRESH_INTERVAL_S if refresh_interval is None else refresh_interval
+        )
+        self._by_barcode: dict[int, sqlite3.Row] = {}
+        self._barcode_by_id: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._last_updated_at: str | None = None
+        self._last_price_change_id = 0
+        self._last_check = 0.0
+        self.version = 0
+
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    # ---- carga / refresco ----
+
+    def load(self):
+        """Carga completa del catálogo (descarta lo que hubiera)."""
+        conn = self._get_conn()
+        with self._lock:
+            self._by_barcode.clear()
+            self._barcode_by_id.clear()
+            rows = conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM productos").fetchall()
+            for row in rows:
+                self._store(row)
+            self._last_updated_at = max(
+                (row["updated_at"] for row in rows if row["updated_at"]), default=None
+            )
+            cur = conn.execute("SELECT COALESCE(MAX(id), 0) AS m FROM historial_precios")
+            self._last_price_change_id = cur.fetchone()["m"]
+            self._last_check = time.monotonic()
+            self._loaded = True
+            self.version += 1
+
+    def refresh(self):
+        """Trae solo los productos modificados desde el último refresco."""
+        conn = self._get_conn()
+        with self._lock:
+            if self._last_updated_at is None:
+                rows = conn.execute(
+                    f"SELECT {PRODUCT_COLUMNS} FROM productos WHERE updated_at IS NOT NULL"
+                ).fetchall()
+            else:
+                # >= para no perder cambios del mismo segundo (re-aplicar es idempotente)
+                rows = conn.execute(
+                    f"SELECT {PRODUCT_COLUMNS} FROM productos WHERE updated_at >= ?",
+                    (self._last_updated_at,),
+                ).fetchall()
+            for row in rows:
+                self._store(row)
+                if self._last_updated_at is None or row["updated_at"] > self._last_updated_at:
+                    self._last_updated_at = row["updated_at"]
+
+            # Cambios de precio registrados por tr_before_update_producto_precio
+            changes = conn.execute(
+                "SELECT id, producto_id FROM historial_precios WHERE id > ? ORDER BY id",
+                (self._last_price_change_id,),
+            ).fetchall()
+            if changes:
+                self._last_price_change_id = changes[-1]["id"]
+                self._reload_ids(conn, {c["producto_id"] for c in changes})
+
+            self._last_check = time.monotonic()
+            self.refreshes += 1
+
+    def invalidate(self, product_ids=None):
+        """
+        Invalida productos puntuales (se recargan en el acto) o, sin argumentos,
+        todo el índice (se recarga en el próximo acceso).
+        """
+        if product_ids is None:
+            with self._lock:
+                self._loaded = False
+                self.version += 1
+            return
+        conn = self._get_conn()
+        with self._lock:
+            self._reload_ids(conn, set(product_ids))
+
+    def _maybe_refresh(self):
+        if not self._loaded:
+            self.load()
+        elif time.monotonic() - self._last_check >= self.refresh_interval:
+            self.refresh()
+
+    def current_version(self) -> int:
+        """Versión del catálogo, refrescando antes si corresponde."""
+        self._maybe_refresh()
+        return self.version
+
+    # ---- consultas ----
+
+    def get(self, barcode: int):
+        """Devuelve la fila del producto activo con ese código, o None."""
+        self._maybe_refresh()
+        # Los contadores se tocan desde varios hilos: siempre con el lock
+        with self._lock:
+            row = self._by_barcode.get(barcode)
+            if row is not None:
+                self.hits += 1
+                return row
+            self.misses += 1
+
+        # Puede ser un producto dado de alta después del último refresco
+        conn = self._get_conn()
+        row = conn.execute(
+            f"SELECT {PRODUCT_COLUMNS} FROM productos WHERE codigo_barr = ?",
+            (barcode,),
+        ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._store(row)
+        return self._by_barcode.get(barcode)
+
+    def peek(self, barcode: int):
+        """Como get(), pero sin consultar la BD ante un miss."""
+        self._maybe_refresh()
+        with self._lock:
+            row = self._by_barcode.get(barcode)
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return row
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._by_barcode),
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+            }
+
+    # ---- internos (llamar con el lock tomado) ----
+
+    def _store(self, row: sqlite3.Row):
+        old_barcode = self._barcode_by_id.pop(row["id"], None)
+        old = None
+        if old_barcode is not None:
+            old = self._by_barcode.pop(old_barcode, None)
+        # Los inactivos no se indexan (activo NULL cuenta como activo)
+        if row["activo"] == 0:
+            if old is not None:
+                self.version += 1
+            return
+        barcode = int(row["barcode"])
+        self._by_barcode[barcode] = row
+        self._barcode_by_id[row["id"]] = barcode
+        # El refresco relee las filas del último segundo: solo cuenta si cambió algo
+        if old is None or _listed(old) != _listed(row):
+            self.version += 1
+
+    def _reload_ids(self, conn: sqlite3.Connection, product_ids: set[int]):
+        for product_id in product_ids:
+            row = conn.execute(
+                f"SELECT {PRODUCT_COLUMNS} FROM productos WHERE id = ?",
+                (product_id,),
+            ).fetchone()
+            if row is None:
+                barcode = self._barcode_by_id.pop(product_id, None)
+                if barcode is not None:
+                    self._by_barcode.pop(barcode, None)
+                    self.version += 1
+            else:
+                self._store(row)
+
+
+def _listed(row: sqlite3.Row) -> tuple:
+    return tuple(row[column] for column in LISTED_COLUMNS)
+
+
+class ListingCache:
+    """
+    Caché LRU de páginas del listado de productos, compartida por todas las
+    sesiones del proceso. Cada página guarda la versión del catálogo
+    (ProductIndex.version) con la que se leyó: si el índice vio cambios
+    desde entonces la página no sirve y se vuelve a consultar.
+    """
+
+    MAX_ENTRIES = 256
+
+    def __init__(self, max_entries: int | None = None):
+        self.max_entries = self.MAX_ENTRIES if max_entries is None else max_entries
+        self._pages: OrderedDict[tuple, tuple[int, list]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, version: int) -> list | None:
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, version: int, rows: list):
+        with self._lock:
+            self._pages[key] = (version, rows)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._pages), "hits": self.hits, "misses": self.misses}
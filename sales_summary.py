@@ -0,0 +1,260 @@
+"""
+Resúmenes diarios de ventas (por caja y por producto) para los tableros.
+
+vw_ventas_hoy filtraba con DATE(v.fecha), que no puede usar idx_ventas_fecha,
+y vw_top_productos_vendidos agrupaba todo el detalle de 30 días en cada
+consulta. Ahora:
+- ventas_diarias (fecha, caja_id) y ventas_producto_diarias (fecha,
+  producto_id) guardan los totales de cada día
+- record_sale() los suma al cerrar una venta, en la misma transacción
+  (create_sale_from_cart)
+- rollup() recalcula los últimos días desde ventas / detalle_ventas: cubre
+  lo que escriben otros módulos (ventas cargadas por fila, anulaciones). Lo
+  corre RollupJob cada tanto o `python sales_summary.py` desde cron
+- las vistas leen de los resúmenes o filtran por rango de fecha
+
+`fecha` es DATE(ventas.fecha), igual que comparaban las vistas originales.
+"""
+import argparse
+import datetime
+import sqlite3
+import threading
+
+TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS ventas_diarias (
+        fecha TEXT NOT NULL,
+        caja_id INTEGER NOT NULL,
+        tickets INTEGER NOT NULL DEFAULT 0,
+        subtotal REAL NOT NULL DEFAULT 0,
+        descuento REAL NOT NULL DEFAULT 0,
+        total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, caja_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ventas_producto_diarias (
+        fecha TEXT NOT NULL,
+        producto_id INTEGER NOT NULL,
+        cantidad REAL NOT NULL DEFAULT 0,
+        ingresos REAL NOT NULL DEFAULT 0,
+        lineas INTEGER NOT NULL DEFAULT 0,
+        suma_precio REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, producto_id)
+    ) WITHOUT ROWID
+    """,
+)
+
+# Vistas que reemplazan a las del esquema original (mismas columnas)
+VIEWS = {
+    # Detalle de tickets: sigue leyendo ventas, pero por rango sobre idx_ventas_fecha
+    "vw_ventas_hoy": """
+        CREATE VIEW vw_ventas_hoy AS
+        SELECT
+            v.id,
+            v.numero_ticket,
+            c.numero as caja_numero,
+            u.nombre || ' ' || u.apellido as cajero,
+            v.cliente_nombre,
+            v.subtotal,
+            v.descuento,
+            v.iva,
+            v.total,
+            v.forma_pago,
+            v.fecha
+        FROM ventas v
+        JOIN cajas c ON v.caja_id = c.id
+        JOIN usuarios u ON v.usuario_id = u.id
+        WHERE v.fecha >= DATE('now') AND v.fecha < DATE('now', '+1 day')
+          AND v.estado = 'completada'
+    """,
+    "vw_top_productos_vendidos": """
+        CREATE VIEW vw_top_productos_vendidos AS
+        SELECT
+            p.id,
+            p.codigo_barr,
+            p.descripcion,
+            c.nombre as categoria,
+            t.total_vendido,
+            t.total_ingresos,
+            t.precio_promedio
+        FROM (
+            SELECT
+                producto_id,
+                SUM(cantidad) AS total_vendido,
+                SUM(ingresos) AS total_ingresos,
+                SUM(suma_precio) / SUM(lineas) AS precio_promedio
+            FROM ventas_producto_diarias
+            WHERE fecha >= DATE('now', '-30 days')
+            GROUP BY producto_id
+            HAVING SUM(lineas) > 0
+        ) AS t
+        JOIN productos p ON t.producto_id = p.id
+        JOIN categorias c ON p.categoria_id = c.id
+        ORDER BY t.total_vendido DESC
+        LIMIT 10
+    """,
+    "vw_resumen_ventas_hoy": """
+        CREATE VIEW vw_resumen_ventas_hoy AS
+        SELECT
+            c.numero as caja_numero,
+            c.nombre as caja,
+            r.tickets,
+            r.subtotal,
+            r.descuento,
+            r.total
+        FROM ventas_diarias r
+        JOIN cajas c ON r.caja_id = c.id
+        WHERE r.fecha = DATE('now')
+        ORDER BY c.numero
+    """,
+}
+
+# Días que recalcula el rollup periódico (hoy y ayer: cubre ventas cerca de medianoche)
+ROLLUP_DAYS = 2
+
+
+def record_sale(conn: sqlite3.Connection | sqlite3.Cursor, venta_id: int):
+    """
+    Suma una venta completada a los resúmenes. Debe correr en la misma
+    transacción que la deja en 'completada', con los totales ya finales.
+    """
+    conn.execute(
+        """
+        INSERT INTO ventas_diarias (fecha, caja_id, tickets, subtotal, descuento, total)
+        SELECT DATE(fecha), caja_id, 1, subtotal, descuento, total
+        FROM ventas
+        WHERE id = ? AND estado = 'completada'
+        ON CONFLICT (fecha, caja_id) DO UPDATE SET
+            tickets = tickets + excluded.tickets,
+            subtotal = subtotal + excluded.subtotal,
+            descuento = descuento + excluded.descuento,
+            total = total + excluded.total
+        """,
+        (venta_id,),
+    )
+    conn.execute(
+        """
+        INSERT INTO ventas_producto_diarias (
+            fecha, producto_id, cantidad, ingresos, lineas, suma_precio
+        )
+        SELECT DATE(v.fecha), d.producto_id, SUM(d.cantidad), SUM(d.subtotal),
+               COUNT(*), SUM(d.precio_unitario)
+        FROM detalle_ventas AS d
+        JOIN ventas AS v ON v.id = d.venta_id
+        WHERE d.venta_id = ? AND v.estado = 'completada'
+        -- "+": buscar por el índice de la venta, no recorrer el de producto
+        GROUP BY +d.producto_id
+        ON CONFLICT (fecha, producto_id) DO UPDATE SET
+            cantidad = cantidad + excluded.cantidad,
+            ingresos = ingresos + excluded.ingresos,
+            lineas = lineas + excluded.lineas,
+            suma_precio = suma_precio + excluded.suma_precio
+        """,
+        (venta_id,),
+    )
+
+
+def rollup(conn: sqlite3.Connection | sqlite3.Cursor, since: str | None = None):
+    """
+    Recalcula los resúmenes desde el día `since` (YYYY-MM-DD; None = todo)
+    leyendo ventas por rango de fecha. Idempotente: reemplaza esos días.
+    Debe correr dentro de una transacción.
+    """
+    since = since or ""
+    conn.execute("DELETE FROM ventas_diarias WHERE fecha >= ?", (since,))
+    conn.execute(
+        """
+        INSERT INTO ventas_diarias (fecha, caja_id, tickets, subtotal, descuento, total)
+        SELECT DATE(fecha), caja_id, COUNT(*),
+               SUM(subtotal), SUM(descuento), SUM(total)
+        FROM ventas
+        WHERE fecha >= ? AND estado = 'completada'
+        GROUP BY DATE(fecha), caja_id
+        """,
+        (since,),
+    )
+    conn.execute("DELETE FROM ventas_producto_diarias WHERE fecha >= ?", (since,))
+    conn.execute(
+        """
+        INSERT INTO ventas_producto_diarias (
+            fecha, producto_id, cantidad, ingresos, lineas, suma_precio
+        )
+        SELECT DATE(v.fecha), d.producto_id, SUM(d.cantidad), SUM(d.subtotal),
+               COUNT(*), SUM(d.precio_unitario)
+        FROM ventas AS v
+        JOIN detalle_ventas AS d ON d.venta_id = v.id
+        WHERE v.fecha >= ? AND v.estado = 'completada'
+        GROUP BY DATE(v.fecha), d.producto_id
+        """,
+        (since,),
+    )
+
+
+def rollup_since(days: int = ROLLUP_DAYS) -> str:
+    """Primer día (UTC, como DATE('now')) de los últimos `days` días."""
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    return (today - datetime.timedelta(days=days - 1)).isoformat()
+
+
+class RollupJob:
+    """Corre rollup() de los últimos ROLLUP_DAYS días cada INTERVAL_S en un hilo."""
+
+    INTERVAL_S = 300.0
+
+    def __init__(self, db, interval: float | None = None, days: int = ROLLUP_DAYS):
+        self.db = db
+        self.interval = self.INTERVAL_S if interval is None else interval
+        self.days = days
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        # Contadores
+        self.runs = 0
+        self.errors = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="sales-rollup", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def run_once(self):
+        with self.db._transaction() as conn:
+            rollup(conn, rollup_since(self.days))
+        self.runs += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except sqlite3.Error:
+                # Se reintenta en la próxima vuelta
+                self.errors += 1
+
+
+def main():
+    from main import Database
+
+    parser = argparse.ArgumentParser(description="Recalcula los resúmenes diarios de ventas")
+    parser.add_argument("--days", type=int, default=ROLLUP_DAYS, help="últimos N días")
+    parser.add_argument("--all", action="store_true", help="reconstruir todo el historial")
+    parser.add_argument("--db", help="ruta de la BD (por defecto database/supermarket.db)")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        db.init_schema_and_seed()
+        with db._transaction() as conn:
+            rollup(conn, None if args.all else rollup_since(args.days))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
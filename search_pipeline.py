@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable
+
+from metrics import LatencyHistogram
+
+
+class SearchPipeline:
+    """
+    Búsqueda del diálogo de productos fuera del hilo de la UI.
+
+    - debounce: solo se consulta cuando el usuario deja de tipear DEBOUNCE_S
+    - cada tecla nueva deja obsoletas las búsquedas anteriores; si una está
+      corriendo se interrumpe con interrupt_fn (sqlite3 Connection.interrupt)
+    - las consultas corren en el executor (propio de un hilo, o uno compartido
+      entre sesiones); la interrupción se hace con self._lock tomado, así
+      solo alcanza al hilo mientras sigue en una consulta de este buscador
+    - on_result(texto, filas, offset) solo se llama con el resultado más nuevo
+    - on_error(texto, error, offset) si la consulta vigente falla
+    - ambos se llaman con self._lock tomado (un submit() no puede colarse
+      entre el chequeo y la entrega): deben ser cortos, como page.run_task,
+      y no volver a llamar al buscador
+    - load_more() pide la página siguiente de la búsqueda vigente
+    - latency mide desde la tecla hasta el resultado aplicado
+    """
+
+    DEBOUNCE_S = 0.25
+
+    def __init__(
+        self,
+        search_fn: Callable[..., list],
+        on_result: Callable[[str, list, int], None],
+        debounce_s: float | None = None,
+        executor: Executor | None = None,
+        interrupt_fn: Callable[[threading.Thread], None] | None = None,
+        latency: LatencyHistogram | None = None,
+        on_error: Callable[[str, Exception, int], None] | None = None,
+    ):
+        self._search_fn = search_fn
+        self._on_result = on_result
+        self._on_error = on_error
+        self.debounce_s = self.DEBOUNCE_S if debounce_s is None else debounce_s
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="product-search"
+        )
+        self._interrupt_fn = interrupt_fn
+
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._timer: threading.Timer | None = None
+        # (generación, hilo) de la consulta que está corriendo ahora
+        self._running: tuple[int, threading.Thread] | None = None
+        self._closed = False
+
+        self.latency = latency or LatencyHistogram()
+        self.executed = 0
+        self.discarded = 0
+
+    def submit(self, text: str, immediate: bool = False):
+        """Nueva búsqueda: reemplaza cualquier búsqueda pendiente o en curso."""
+        submitted_at = time.perf_counter()
+        with self._lock:
+            if self._closed:
+                return
+            self._generation += 1
+            generation = self._generation
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            # Hay una consulta vieja en curso: que no termine para nada
+            self._interrupt_running()
+
+            if immediate or self.debounce_s <= 0:
+                self._dispatch(generation, text, submitted_at)
+            else:
+                self._timer = threading.Timer(
+                    self.debounce_s, self._dispatch, args=(generation, text, submitted_at)
+                )
+                self._timer.daemon = True
+                self._timer.start()
+
+    def load_more(self, text: str, offset: int):
+        """Página siguiente (offset) de la búsqueda vigente, sin invalidarla."""
+        with self._lock:
+            if self._closed:
+                return
+            generation = self._generation
+        try:
+            self._executor.submit(self._run, generation, text, None, offset)
+        except RuntimeError:
+            pass
+
+    def cancel(self):
+        """Descarta lo pendiente sin lanzar una búsqueda nueva."""
+        with self._lock:
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._interrupt_running()
+
+    def close(self):
+        self.cancel()
+        with self._lock:
+            self._closed = True
+        if self._own_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---- internos ----
+
+    def _interrupt_running(self):
+        """
+        Interrumpe la consulta en curso (con self._lock tomado). _run limpia
+        _running bajo el mismo lock: mientras lo tenemos, ese hilo no puede
+        haber pasado a la consulta de otra sesión. Si la sentencia ya terminó,
+        interrupt no afecta a la siguiente (SQLite lo resetea al empezar).
+        """
+        if self._running is not None and self._interrupt_fn is not None:
+            self._interrupt_fn(self._running[1])
+
+    def _is_current(self, generation: int) -> bool:
+        return generation == self._generation and not self._closed
+
+    def _dispatch(self, generation: int, text: str, submitted_at: float):
+        if not self._is_current(generation):
+            return
+        try:
+            self._executor.submit(self._run, generation, text, submitted_at)
+        except RuntimeError:
+            # Executor cerrado entre tanto: el diálogo ya no existe
+            pass
+
+    def _run(self, generation: int, text: str, submitted_at: float | None, offset: int = 0):
+        with self._lock:
+            if not self._is_current(generation):
+                self.discarded += 1
+                return
+            self._running = (generation, threading.current_thread())
+
+        try:
+            rows = self._run_query(generation, text, offset)
+        except Exception as ex:
+            with self._lock:
+                self._running = None
+                if self._is_current(generation) and self._on_error is not None:
+                    self._on_error(text, ex, offset)
+            raise
+
+        with self._lock:
+            self._running = None
+            if rows is None or not self._is_current(generation):
+                self.discarded += 1
+                return
+            self.executed += 1
+            self._on_result(text, rows, offset)
+        if submitted_at is not None:
+            self.latency.observe((time.perf_counter() - submitted_at) * 1000)
+
+    def _run_query(self, generation: int, text: str, offset: int):
+        try:
+            return self._search_fn(text, offset=offset)
+        except sqlite3.OperationalError as ex:
+            # Interrumpida a propósito: ya hay una búsqueda más nueva
+            if "interrupted" in str(ex) and not self._is_current(generation):
+                return None
+            raise
@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+from typing import Callable
+
+
+class TicketAllocator:
+    """
+    Números de ticket por caja sin colisiones.
+
+    El contador de cada caja vive en la tabla ticket_secuencias. En vez de
+    tocarla en cada venta, cada proceso reserva un bloque de BLOCK_SIZE
+    números con un UPSERT ... RETURNING atómico y los reparte desde memoria.
+    Dos kioscos (o procesos) nunca reciben el mismo bloque; dentro de un
+    proceso los números de una caja son siempre crecientes. Un número que
+    no llegó a una venta se devuelve con give_back(); si ya se entregó uno
+    posterior, o el proceso se reinicia, queda como hueco: nunca se repite.
+
+    Formato legible: M<caja>-<secuencia>, p. ej. M001-000000042.
+    """
+
+    BLOCK_SIZE = 50
+
+    def __init__(
+        self,
+        get_conn: Callable[[], sqlite3.Connection],
+        block_size: int | None = None,
+    ):
+        self._get_conn = get_conn
+        self.block_size = self.BLOCK_SIZE if block_size is None else block_size
+        # caja_id -> [próximo número, fin del bloque (exclusivo)]
+        self._blocks: dict[int, list[int]] = {}
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.issued = 0
+        self.reservations = 0
+
+    @staticmethod
+    def format(caja_numero: int, seq: int) -> str:
+        return f"M{caja_numero:03d}-{seq:09d}"
+
+    def next_ticket(self, caja_id: int, caja_numero: int) -> str:
+        """
+        Próximo número de ticket de la caja. Si hay que reservar un bloque
+        nuevo lo hace en su propia transacción, así que no se puede llamar
+        con una transacción abierta en la conexión del hilo.
+        """
+        with self._lock:
+            block = self._blocks.get(caja_id)
+            if block is None or block[0] >= block[1]:
+                block = self._reserve(caja_id)
+                self._blocks[caja_id] = block
+            seq = block[0]
+            block[0] += 1
+            self.issued += 1
+        return self.format(caja_numero, seq)
+
+    def give_back(self, caja_id: int, numero_ticket: str) -> bool:
+        """
+        Devuelve un número que no se usó (venta abortada). Solo se puede si
+        es el último entregado de la caja; devuelve si se recuperó.
+        """
+        seq = int(numero_ticket.rsplit("-", 1)[1])
+        with self._lock:
+            block = self._blocks.get(caja_id)
+            if block is None or block[0] != seq + 1:
+                return False
+            block[0] = seq
+            self.issued -= 1
+        return True
+
+    def _reserve(self, caja_id: int) -> list[int]:
+        conn = self._get_conn()
+        if conn.in_transaction:
+            # Si el checkout hiciera rollback el bloque quedaría "devuelto" en la
+            # BD pero en uso en memoria: otro proceso podría reservarlo de nuevo
+            raise RuntimeError("La reserva de tickets no puede ir dentro de otra transacción.")
+        with conn:
+            end = conn.execute(
+                """
+                INSERT INTO ticket_secuencias (caja_id, siguiente)
+                VALUES (?, 1 + ?)
+                ON CONFLICT (caja_id) DO UPDATE SET siguiente = siguiente + excluded.siguiente - 1
+                RETURNING siguiente
+                """,
+                (caja_id, self.block_size),
+            ).fetchone()[0]
+        self.reservations += 1
+        return [end - self.block_size, end]